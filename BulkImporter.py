@@ -0,0 +1,180 @@
+import os
+import csv
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from QuestionHandler import QuestionHandler
+from QuestionRecord import QuestionRecord
+from helper_functions import question_text_key
+import constants as c
+
+"""BulkImporter
+Imports a large question set into a topic (python qtest.py --import FILE TOPIC):
+- FILE is a csv file (delimiter ; , or tab, first row are the column names) or a JSONL file (.jsonl/.json, one
+  object per line) with the columns Type, Question, Answer_A..Answer_D and Correct (Flag is optional)
+- the file is read in chunks of c.IMPORT_CHUNK_SIZE rows, which are checked by a pool of worker processes while the
+  next chunks are read; only a few chunks are in flight at any time, so the file is never read into memory at once
+- questions which are already in the topic or came earlier in the file (same text and answers, with case, whitespace
+  and punctuation ignored, see QuestionHandler.find_duplicate) are not imported again
+- rows which are not valid or duplicates are written to a side file next to FILE (e.g. questions.rejected.csv) with their row
+  number and the reason; the valid ones get the next IDs of the topic in the order of the file
+- all questions are added to the topic (a new topic file is created if there is none) and saved in one save
+Checks: Type is f or m, Question and Correct are required, multiple choice questions need all four answers and
+Correct has to be A, B, C or D, Flag (if given) is 0 or 1.
+"""
+
+class BulkImporter:
+    def __init__(self, file_path, topic_name, user_name = c.IMPORT_USER_NAME):
+        self.file_path = file_path
+        self.topic_name = topic_name
+        self.user_name = user_name
+        self.is_jsonl = os.path.splitext(file_path)[1].lower() in (".jsonl", ".json")
+        root, extension = os.path.splitext(file_path)
+        self.rejects_file_path = f"{root}{c.IMPORT_REJECTS_SUFFIX}{extension}"
+        self.fieldnames = None
+        self.imported = 0
+        self.rejected = 0
+
+    def run(self):
+# returns (number of imported questions, number of rejected rows)
+        if not os.path.exists(f"{c.DATA_FOLDER}/{self.topic_name}.csv"):
+            create_topic_file(self.topic_name)
+        questions = QuestionHandler(self.topic_name,10,130)
+        records = []
+# text key -> row number of the questions taken from the file so far; the whole key and not its hash, so two
+# different questions with the same hash are both imported
+        imported_rows = {}
+        with open(self.rejects_file_path, "w", newline="") as rejects_file:
+            for first_row_number, rows, chunk_records, rejects in self.validate_chunks():
+                for row_number, record in chunk_records:
+                    text_key = question_text_key(record)
+                    duplicate_id = questions.find_duplicate(record,text_key)
+                    if duplicate_id != None:
+                        rejects.append((row_number, rows[row_number - first_row_number], f"duplicate of question {duplicate_id}"))
+                    elif text_key in imported_rows:
+                        rejects.append((row_number, rows[row_number - first_row_number], f"duplicate of row {imported_rows[text_key]}"))
+                    else:
+                        imported_rows[text_key] = row_number
+                        records.append(record)
+                for row_number, row, reason in sorted(rejects, key=lambda reject: reject[0]):
+                    self.write_reject(rejects_file,row_number,row,reason)
+        if self.rejected == 0:
+            os.remove(self.rejects_file_path)
+        if len(records) > 0:
+            questions.add_records(records)
+            questions.save_file(self.user_name,True)
+        questions.counter_buffer.stop()
+        self.imported = len(records)
+        return self.imported, self.rejected
+
+    def validate_chunks(self):
+# yields (number of the first row, rows, records, rejects) per chunk in the order of the file
+        pending = deque()
+        with ProcessPoolExecutor() as executor:
+            for first_row_number, rows in self.read_chunks():
+                pending.append((first_row_number, rows, executor.submit(validate_rows, first_row_number, rows, self.is_jsonl)))
+                if len(pending) > 2 * (os.cpu_count() or 1):
+                    first_row_number, rows, future = pending.popleft()
+                    yield (first_row_number, rows) + future.result()
+            while len(pending) > 0:
+                first_row_number, rows, future = pending.popleft()
+                yield (first_row_number, rows) + future.result()
+
+    def read_chunks(self):
+# yields (number of the first row, rows); csv rows are dicts, JSONL rows are the lines, parsed by the workers
+        with open(self.file_path, "r", newline="", encoding="utf-8-sig") as input_file:
+            if self.is_jsonl:
+                rows = input_file
+                first_row_number = 1
+            else:
+                try:
+                    delimiter = csv.Sniffer().sniff(input_file.read(65536), delimiters=";,\t").delimiter
+                except csv.Error:
+                    delimiter = c.CSV_FILE_DELIMITER
+                input_file.seek(0)
+                rows = csv.DictReader(input_file, delimiter=delimiter)
+                self.fieldnames = rows.fieldnames
+                first_row_number = 2
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == c.IMPORT_CHUNK_SIZE:
+                    yield first_row_number, chunk
+                    first_row_number += len(chunk)
+                    chunk = []
+            if len(chunk) > 0:
+                yield first_row_number, chunk
+
+    def write_reject(self,rejects_file,row_number,row,reason):
+        if self.rejected == 0 and not self.is_jsonl:
+            self.rejects_writer = csv.DictWriter(rejects_file, fieldnames=["Row","Reason"] + (self.fieldnames or []), delimiter=c.CSV_FILE_DELIMITER, extrasaction="ignore")
+            self.rejects_writer.writeheader()
+        self.rejected += 1
+        if self.is_jsonl:
+            rejects_file.write(json.dumps({"row": row_number, "reason": reason, "line": row.rstrip("\n")}) + "\n")
+        else:
+            self.rejects_writer.writerow({"Row": row_number, "Reason": reason, **{key: value for key, value in row.items() if key != None}})
+
+def validate_rows(first_row_number,rows,is_jsonl):
+# runs in the worker processes; returns (records, rejects) with records as (row number, record) and rejects as
+# (row number, row, reason)
+    records = []
+    rejects = []
+    for row_number, row in enumerate(rows, first_row_number):
+        if is_jsonl:
+            if row.strip() == "":
+                continue
+            try:
+                values = json.loads(row)
+            except ValueError:
+                rejects.append((row_number, row, "not valid JSON"))
+                continue
+        else:
+            values = row
+        record, reason = validate_row(values)
+        if record == None:
+            rejects.append((row_number, row, reason))
+        else:
+            records.append((row_number, record))
+    return records, rejects
+
+def validate_row(values):
+# returns (record, None) for a valid row and (None, reason) otherwise
+    if not isinstance(values, dict):
+        return None, "not a question object"
+    if None in values:
+        return None, "too many values"
+    record = {field: "" if values.get(field) == None else str(values[field]).strip() for field in QuestionRecord.fields[:-1]}
+    record["Type"] = record["Type"].lower()
+    if record["Type"] not in ("f", "m"):
+        return None, "Type has to be f or m"
+    if record["Question"] == "":
+        return None, "Question is missing"
+    if record["Type"] == "m":
+        for letter in "ABCD":
+            if record[f"Answer_{letter}"] == "":
+                return None, f"Answer_{letter} is missing"
+        record["Correct"] = record["Correct"].upper()
+        if record["Correct"] not in ("A", "B", "C", "D"):
+            return None, "Correct has to be A, B, C or D"
+    else:
+        if record["Correct"] == "":
+            return None, "Correct is missing"
+        record["Answer_A"], record["Answer_B"], record["Answer_C"], record["Answer_D"] = ("","","","")
+    if record["Flag"] == "":
+        record["Flag"] = c.FLAG_ENABLED
+    elif record["Flag"] in ("0", "1"):
+        record["Flag"] = int(record["Flag"])
+    else:
+        return None, "Flag has to be 0 or 1"
+    record["Asked"] = 0
+    record["Answered"] = 0
+    return record, None
+
+def create_topic_file(topic_name):
+# an empty topic file: header and settings row
+    headers = ["ID"] + list(QuestionRecord.fields[:-1])
+    with open(f"{c.DATA_FOLDER}/{topic_name}.csv", "w", newline="") as csvfile:
+        writer = csv.writer(csvfile,delimiter=c.CSV_FILE_DELIMITER)
+        writer.writerow(headers)
+        writer.writerow([0, "never", "no one"] + ["Unused"]*(len(headers)-3))
@@ -0,0 +1,99 @@
+import constants as c
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+"""ColumnStore
+Optional columnar copy of the question statistics in NumPy arrays (one row per question):
+ids, present (False once the question is removed), enabled (enabled and not deleted), asked and answered.
+On these columns the statistics of all questions are computed at once instead of in a loop per question:
+- sampler_weights: the weights for the WeightedSamplers (same formula as QuestionHandler.get_practise_weight)
+- ranking_columns / sorted_ids: the statistics order (same order as QuestionHandler.get_ranking_key)
+- sample_enabled: a random sample of enabled questions for a test
+NumPy is not required: ColumnStore.available is False without it and QuestionHandler uses its pure Python code.
+Rows are updated one by one with set_row/remove_row; the arrays grow like a list (capacity is doubled).
+"""
+
+class ColumnStore:
+    available = np != None
+
+    def __init__(self):
+        self.rng = np.random.default_rng()
+        self.load((), (), (), ())
+
+    def load(self,ids,enabled,asked,answered):
+# bulk load; the arguments are iterables of the same length, e.g. lists or generators over the records
+        self.ids = np.fromiter(ids, dtype=np.int64)
+        self.length = len(self.ids)
+        self.present = np.ones(self.length, dtype=bool)
+        self.enabled = np.fromiter(enabled, dtype=bool, count=self.length)
+        self.asked = np.fromiter(asked, dtype=np.int64, count=self.length)
+        self.answered = np.fromiter(answered, dtype=np.int64, count=self.length)
+        self.positions = dict(zip(self.ids.tolist(), range(self.length)))
+        self.ranked_ids = None
+
+    def set_row(self,record_id,enabled,asked,answered):
+        row = self.positions.get(record_id)
+        if row == None:
+            if self.length == len(self.ids):
+                self.grow()
+            row = self.length
+            self.length += 1
+            self.positions[record_id] = row
+            self.ids[row] = record_id
+        self.present[row] = True
+        self.enabled[row] = enabled
+        self.asked[row] = asked
+        self.answered[row] = answered
+        self.ranked_ids = None
+
+    def remove_row(self,record_id):
+# the row is kept for the case that the record is indexed again, e.g. after an update
+        row = self.positions.get(record_id)
+        if row != None:
+            self.present[row] = False
+            self.enabled[row] = False
+            self.ranked_ids = None
+
+    def grow(self):
+        capacity = max(16, 2 * len(self.ids))
+        for name in ("ids", "present", "enabled", "asked", "answered"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def columns(self):
+# the columns of the rows which are still present
+        mask = self.present[:self.length]
+        return self.ids[:self.length][mask], self.enabled[:self.length][mask], self.asked[:self.length][mask], self.answered[:self.length][mask]
+
+    def sampler_weights(self):
+# returns ids, their practise weights (1 - success rate scaled to c.PRACTISE_WEIGHT_SCALE, the full weight for
+# never asked questions and 0 for disabled ones) and 1 for enabled / 0 for disabled questions
+        ids, enabled, asked, answered = self.columns()
+        weights = np.full(len(ids), c.PRACTISE_WEIGHT_SCALE, dtype=np.int64)
+        was_asked = asked > 0
+        weights[was_asked] = np.maximum(0, (asked[was_asked] - answered[was_asked]) * c.PRACTISE_WEIGHT_SCALE // asked[was_asked])
+        weights[~enabled] = 0
+        return ids, weights, enabled.astype(np.int64)
+
+    def ranking_columns(self):
+# returns the columns of the ranking keys (negative success rate, negative asked, id), sorted in ranking order
+        ids, enabled, asked, answered = self.columns()
+        rates = np.zeros(len(ids), dtype=np.float64)
+        was_asked = asked > 0
+        rates[was_asked] = -answered[was_asked] / asked[was_asked]
+        order = np.lexsort((ids, -asked, rates))
+        return rates[order], -asked[order], ids[order]
+
+    def sorted_ids(self):
+# the order is kept until a row changes
+        if self.ranked_ids == None:
+            self.ranked_ids = self.ranking_columns()[2].tolist()
+        return list(self.ranked_ids)
+
+    def sample_enabled(self,cnt):
+        ids, enabled, asked, answered = self.columns()
+        return self.rng.choice(ids[enabled], cnt, replace=False).tolist()
@@ -0,0 +1,127 @@
+import atexit
+import threading
+from array import array
+from FileLock import FileLock
+import constants as c
+
+"""CounterBuffer
+Write-behind buffer for the counter increments (e.g. Asked/Answered) of one topic.
+- every record gets a slot the first time it is counted; the increments live in one integer array per counter,
+  so counting an answer does not create any objects once the record has a slot
+- a background thread writes the increments every c.COUNTER_FLUSH_INTERVAL seconds, as soon as
+  c.COUNTER_FLUSH_THRESHOLD increments are waiting, and when the program ends
+- write_function(deltas) does the writing; it gets {record ID: [increment per counter]} and is called while the
+  buffer holds the file lock (lock_file_path), so the data handler sees either both or none of the increments
+- held records (records not saved to file yet, which may still get another ID) are left for the data handler,
+  which takes everything when it saves
+So a crash loses at most the increments of one flush interval.
+"""
+
+class CounterBuffer:
+    def __init__(self, counter_count, lock_file_path, write_function):
+        self.counter_count = counter_count
+        self.lock_file_path = lock_file_path
+        self.write_function = write_function
+        self.lock = threading.Lock()
+        self.flush_event = threading.Event()
+        self.thread = None
+        self.stopped = False
+        self.flushed_entries = 0
+        self.slots = {}
+        self.keys = []
+        self.columns = [array("q") for idx in range(counter_count)]
+        self.held = bytearray()
+        self.touched = bytearray()
+        self.touched_slots = array("q")
+        self.pending = 0
+
+    def add(self,record_id,deltas,hold = False):
+        with self.lock:
+            slot = self.slots.get(record_id)
+            if slot == None:
+                slot = len(self.keys)
+                self.slots[record_id] = slot
+                self.keys.append(record_id)
+                for column in self.columns:
+                    column.append(0)
+                self.held.append(0)
+                self.touched.append(0)
+            for idx in range(self.counter_count):
+                self.columns[idx][slot] += deltas[idx]
+            if hold:
+                self.held[slot] = 1
+            if self.touched[slot] == 0:
+                self.touched[slot] = 1
+                self.touched_slots.append(slot)
+            self.pending += 1
+        if self.thread == None and not self.stopped:
+            self.start()
+        if self.pending >= c.COUNTER_FLUSH_THRESHOLD:
+            self.flush_event.set()
+
+    def has_pending(self):
+        return len(self.touched_slots) > 0
+
+    def peek(self):
+# {record ID: increments} of everything not written yet
+        with self.lock:
+            return {self.keys[slot]: [column[slot] for column in self.columns] for slot in self.touched_slots}
+
+    def take(self,include_held = True,only_held = False):
+# like peek, but the increments returned are removed from the buffer
+        deltas = {}
+        with self.lock:
+            remaining_slots = array("q")
+            for slot in self.touched_slots:
+                if (self.held[slot] and not include_held) or (only_held and not self.held[slot]):
+                    remaining_slots.append(slot)
+                    continue
+                deltas[self.keys[slot]] = [column[slot] for column in self.columns]
+                for column in self.columns:
+                    column[slot] = 0
+                self.held[slot] = 0
+                self.touched[slot] = 0
+            self.touched_slots = remaining_slots
+            self.pending = 0
+        return deltas
+
+    def discard_held(self):
+# used when the unsaved records are thrown away
+        self.take(True,True)
+
+    def put_back(self,deltas):
+        for record_id, record_deltas in deltas.items():
+            self.add(record_id,record_deltas)
+
+    def flush(self):
+        with FileLock(self.lock_file_path):
+            deltas = self.take(False)
+            if len(deltas) == 0:
+                return
+            try:
+                self.write_function(deltas)
+                self.flushed_entries += len(deltas)
+            except OSError:
+                self.put_back(deltas)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def run(self):
+        while not self.stopped:
+            self.flush_event.wait(c.COUNTER_FLUSH_INTERVAL)
+            self.flush_event.clear()
+            if self.has_pending():
+                self.flush()
+
+    def stop(self):
+# stops the thread and writes what is left (except held records)
+        self.stopped = True
+        if self.thread != None:
+            self.flush_event.set()
+            self.thread.join()
+            self.thread = None
+        if self.has_pending():
+            self.flush()
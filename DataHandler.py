@@ -1,16 +1,26 @@
 import csv
+import os
+import json
 import math
 import datetime
 import sys
+import functools
 from abc import ABC,abstractmethod
 from collections import OrderedDict
+from FileLock import FileLock
+from CounterBuffer import CounterBuffer
+from SearchIndex import SearchIndex
+from DataView import DataView
+from FrameRenderer import screen
+from Instrumentation import instruments
 import constants as c
 
 """DataHandler: Abstract class
 This program manages data as follows:
 - data is read from a csv file into an OrderedDict (data)
 - data manipulation is done to the OrderedDict
-- data is saved by overwriting the csv file with the OrderedDict
+- data is saved by appending the changes to a journal file, which is replayed on reading, and by overwriting the
+  csv file with the OrderedDict from time to time (see File handling below)
 This class handles the file operations and the data record operations with the OrderedDict.
 It also prescribes some abstract properties and methods so that these can be referenced in other 
 functions (e.g. display_data_window) by "DataHandler." instead of <object name.>.
@@ -19,6 +29,22 @@ put them here. :)
 """
 
 class DataHandler(ABC):
+# index_fields declares the secondary indexes kept on the records: field name -> True for a unique index
+# (one record per value, e.g. user names) or False for a non-unique one (a set of records per value).
+# Subclasses override it.
+    index_fields = {}
+# search_fields are the fields the search ("/" key) looks in. Subclasses override it.
+    search_fields = ()
+# view_definitions are the views the "V" key offers: key -> (title, condition, sort key or None), see DataView.
+# Subclasses override it.
+    view_definitions = {}
+# record_class is the type the records are stored as: dict or a class which behaves like one (e.g. QuestionRecord)
+# and can be created like dict() from a mapping or from (field, value) pairs.
+    record_class = dict
+# read_errors is a list while the file is read on a background thread (QuestionBankLoader): errors are collected
+# there and reported on the main thread, instead of asking the user right away
+    read_errors = None
+
     def __init__(self, file_name, rows_per_page):
         self.data_file_name = file_name
         self.rows_per_page = rows_per_page
@@ -78,6 +104,8 @@ class DataHandler(ABC):
 # save_flag keeps track if the user made changes to the OrderedDict so we know if we need to write stuff back to disk.
 # data_rows holds the number of records.
 # current_page,total_pages is used for paging through the data on-screen.
+# view_keys is None when the window shows all records, otherwise the IDs it shows (a list of search results or a
+# DataView), described by view_title; page_rows is the number of rows the window pages through.
     @property
     def data_file_name(self):
         return self._data_file_name
@@ -100,44 +128,188 @@ class DataHandler(ABC):
     
     @current_page.setter
     def current_page(self,page):
-        self._current_page = 0 if self.data_rows == 0 else page
+        self._current_page = 0 if self.page_rows == 0 else page
 
     @property
     def total_pages(self):
-        return math.ceil(self.data_rows/self.rows_per_page)
+        return math.ceil(self.page_rows/self.rows_per_page)
 
     @property
     def data_rows(self):
         return len(self.data)
 
+    @property
+    def page_rows(self):
+        return self.data_rows if self.view_keys == None else len(self.view_keys)
+
 # File handling
+# Several qtest processes may share the Data folder, so every file operation is done under an advisory lock
+# (FileLock on a .lock file next to the csv file) and no process ever overwrites what another one saved:
+# - a save first appends the changes since the last save to a journal file next to the csv file:
+#   c.JOURNAL_OP_UPDATE (whole record), c.JOURNAL_OP_DELETE (record ID), c.JOURNAL_OP_COUNTERS (the amounts by
+#   which the counter_fields were increased) and c.JOURNAL_OP_META (file settings of the save)
+# - counters are only ever written as increments, so sessions answering the same question concurrently add up
+#   instead of the last writer winning; a journal update of an existing record keeps its counters
+# - the increments are collected in a CounterBuffer, which appends them to the journal in the background every few
+#   seconds (so they are kept even if the program crashes before the next save) and is emptied by every save
+# - subclasses with journal_mode = True stop there for silent saves (e.g. after each practise session), so a save
+#   costs time proportional to the changes, not to the file size
+# - all other saves and journals with more than c.JOURNAL_COMPACT_THRESHOLD entries are compacted: the csv file and
+#   journal are read again (including changes of other processes), written to a temp file which replaces the csv
+#   file, and the journal is removed. recover_file cleans up if a compaction was interrupted.
+# dirty_keys holds the IDs of records changed since the last save, counter_buffer the counter increments not
+# written yet and journal_entries the number of lines in the journal (plus counter_buffer.flushed_entries).
+    journal_mode = False
+    counter_fields = ()
+
+    @property
+    def data_file_path(self):
+        return f"{c.DATA_FOLDER}/{self.data_file_name}.csv"
+
+    @property
+    def journal_file_path(self):
+        return f"{c.DATA_FOLDER}/{self.data_file_name}.journal"
+
+    @property
+    def lock_file_path(self):
+        return f"{c.DATA_FOLDER}/{self.data_file_name}.lock"
+
+    @instruments.timed
     def read_file(self):
+        with FileLock(self.lock_file_path):
+            self.recover_file()
+            self.load_file()
+
+    @instruments.timed
+    def load_file(self):
+# reads csv file and journal; the caller has to hold the file lock
         self.max_id = 0
         self.save_flag = False
         self.data = OrderedDict()
-        file_name = f"Data/{self.data_file_name}.csv"
-        with open(file_name, "r") as csvfile:
-            reader = csv.DictReader(csvfile,delimiter=c.CSV_FILE_DELIMITER)
-            self.data_headers = reader.fieldnames
-            try:
-                temp_list = list(next(reader).values())
-                self.max_id,self.file_time_stamp,self.file_user = int(temp_list[0]), temp_list[1],temp_list[2]
-            except ValueError:
-                self.max_id,self.file_time_stamp,self.file_user = 0,"never","no one"
-            for record in reader:
-                self.read_record_from_file(record)
+        self.dirty_keys = set()
+        self.journal_entries = 0
+        self.view_keys = None
+        self.view_title = ""
+        self.read_failed = False
+        if getattr(self, "counter_buffer", None) == None:
+            self.counter_buffer = CounterBuffer(len(self.counter_fields), self.lock_file_path, functools.partial(append_counter_entries, self.journal_file_path))
+        self.counter_buffer.flushed_entries = 0
+        self.counter_buffer.discard_held()
+        if not self.read_cache():
+            with open(self.data_file_path, "r") as csvfile:
+                reader = csv.DictReader(csvfile,delimiter=c.CSV_FILE_DELIMITER)
+                self.data_headers = reader.fieldnames
+                try:
+                    temp_list = list(next(reader).values())
+                    self.max_id,self.file_time_stamp,self.file_user = int(temp_list[0]), temp_list[1],temp_list[2]
+                except ValueError:
+                    self.max_id,self.file_time_stamp,self.file_user = 0,"never","no one"
+                for record in reader:
+                    self.read_record_from_file(record)
+# without the records which could not be read, the cache would hide them (and the question about them) next time
+            if not self.read_failed:
+                self.write_cache()
+        self.read_journal()
+# increments which are still in the buffer are not in the journal yet
+        for key, deltas in self.counter_buffer.peek().items():
+            if key in self.data:
+                self.apply_counter_deltas(self.data[key],deltas)
+        self.build_indexes()
+
+# The cache file is a JSON copy of the records exactly as they are after reading the csv file (before the
+# journal is replayed), so loading it skips parsing and converting every record. It belongs to the csv file with
+# the modification time and size stored in it and is ignored (and rewritten) as soon as the csv file changed.
+# The records are stored as one list of values per record to keep the file small and fast to load. JSON and not
+# pickle, because loading a pickle can run code and the Data folder may be shared with other users.
+    @property
+    def cache_file_path(self):
+        return f"{c.DATA_FOLDER}/{c.CACHE_FOLDER_NAME}/{self.data_file_name}.json"
+
+    @instruments.timed
+    def read_cache(self):
+# returns True if the data was loaded from a valid cache file
+        try:
+            file_stat = os.stat(self.data_file_path)
+            with open(self.cache_file_path, "rb") as cache_file:
+                cache = json.loads(cache_file.read())
+            if cache["version"] != c.CACHE_VERSION or cache["file_stamp"] != [file_stat.st_mtime_ns, file_stat.st_size]:
+                return False
+        except Exception:
+            return False
+        self.data_headers = cache["headers"]
+        self.max_id,self.file_time_stamp,self.file_user = cache["settings"]
+        fields = cache["fields"]
+        values = cache["values"]
+# JSON gives every value its own string, so values which are interned when a file is read are interned here as well
+        for column, field in enumerate(fields):
+            if field in getattr(self.record_class, "interned_fields", ()):
+                for record_values in values:
+                    if isinstance(record_values[column], str):
+                        record_values[column] = sys.intern(record_values[column])
+        self.data = OrderedDict(zip(cache["keys"], [self.record_class(zip(fields, record_values)) for record_values in values]))
+        return True
+
+    @instruments.timed
+    def write_cache(self):
+# a missing cache file only costs time, so any error here is ignored
+        fields = list(next(iter(self.data.values())).keys()) if len(self.data) > 0 else []
+        try:
+            file_stat = os.stat(self.data_file_path)
+            cache = {
+                "version": c.CACHE_VERSION,
+                "file_stamp": (file_stat.st_mtime_ns, file_stat.st_size),
+                "headers": self.data_headers,
+                "settings": (self.max_id, self.file_time_stamp, self.file_user),
+                "fields": fields,
+                "keys": list(self.data),
+                "values": [[record[field] for field in fields] for record in self.data.values()],
+            }
+            os.makedirs(os.path.dirname(self.cache_file_path), exist_ok=True)
+            with open(f"{self.cache_file_path}.tmp", "w", encoding="utf-8") as cache_file:
+                json.dump(cache, cache_file, ensure_ascii=False, separators=(",", ":"))
+            os.replace(f"{self.cache_file_path}.tmp", self.cache_file_path)
+        except (OSError, TypeError, ValueError):
+            pass
+
+    @instruments.timed
+    def read_journal(self):
+# replays the journal entries; incomplete lines (e.g. after a crash) are skipped
+        try:
+            journal_file = open(self.journal_file_path, "r", newline="")
+        except FileNotFoundError:
+            return
+        with journal_file:
+            for row in csv.reader(journal_file,delimiter=c.CSV_FILE_DELIMITER):
+                self.journal_entries += 1
+                try:
+                    if row[0] == c.JOURNAL_OP_UPDATE and len(row) == len(self.data_headers) + 1:
+                        record = dict(zip(self.data_headers, row[1:]))
+                        old_record = self.data.get(int(record["ID"]))
+                        if old_record != None:
+                            for field in self.counter_fields:
+                                record[field] = old_record[field]
+                        self.read_record_from_file(record)
+                    elif row[0] == c.JOURNAL_OP_COUNTERS and len(row) == len(self.counter_fields) + 2:
+                        if int(row[1]) in self.data:
+                            self.apply_counter_deltas(self.data[int(row[1])],[int(delta) for delta in row[2:]])
+                    elif row[0] == c.JOURNAL_OP_DELETE:
+                        self.data.pop(int(row[1]), None)
+                    elif row[0] == c.JOURNAL_OP_META:
+                        self.max_id,self.file_time_stamp,self.file_user = int(row[1]), row[2], row[3]
+                except (IndexError, ValueError):
+                    continue
 
+    @instruments.timed
     def save_file(self,user_name,silently = False):
-# loops thru OrderedDict and overwrites file
 # if called with silently = True it will not prompt the user for anything
         if silently == False:
             if self.save_flag == False:
-                input(f"{c.COLOR_HEADER}There is nothing to save. Press enter to continue.{c.COLOR_NORMAL}")
+                screen.input(f"{c.COLOR_HEADER}There is nothing to save. Press enter to continue.{c.COLOR_NORMAL}")
                 self.current_page = 1
                 return True
             
             while True:
-                answer = input(f"{c.COLOR_INPUT}Do you want to save changes? y/n or c to cancel:{c.COLOR_NORMAL} ").lower() 
+                answer = screen.input(f"{c.COLOR_INPUT}Do you want to save changes? y/n or c to cancel:{c.COLOR_NORMAL} ").lower() 
                 if answer == "n":
                     self.read_file()
                     self.current_page = 1
@@ -146,57 +318,209 @@ class DataHandler(ABC):
                     return False
                 if answer == "y":
                     break
-                print(f"{c.COLOR_INPUT}Please make up your mind! :){c.COLOR_NORMAL}")
+                screen.print(f"{c.COLOR_INPUT}Please make up your mind! :){c.COLOR_NORMAL}")
 
-        file_name = f"Data/{self.data_file_name}.csv"
-        with open(file_name, "w", newline="") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=self.data_headers,delimiter=c.CSV_FILE_DELIMITER)
-            writer.writeheader()
-            data_settings = [self.max_id, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), user_name] + ['Unused']*(len(self.data_headers)-3)
-            writer.writerow(dict(zip(self.data_headers, data_settings)))
-            to_delete = []
-            for key, record in self.data.items():
-                if record["Status"] == c.REC_STATUS_DELETED:
-                    to_delete.append(key)
-                    continue
-                temp_record = record.copy()
-                temp_record["ID"] = key
-                del temp_record["Status"]
-                if "Score" in temp_record:
-                    del temp_record["Score"]
-                writer.writerow(temp_record)
-                record["Status"] = c.REC_STATUS_ACTIVE
-            for key in to_delete:
-                del self.data[key]
+        self.file_time_stamp,self.file_user = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), user_name
+        with FileLock(self.lock_file_path):
+            self.recover_file()
+            self.append_journal()
+            if not self.journal_mode or silently == False or self.journal_entries + self.counter_buffer.flushed_entries >= c.JOURNAL_COMPACT_THRESHOLD:
+                self.compact_file()
 
         self.save_flag = False
         self.current_page = 1
         if silently == False:
-            input(f"{c.COLOR_HEADER}Data saved to file. Press enter to continue.{c.COLOR_NORMAL}")
+            screen.input(f"{c.COLOR_HEADER}Data saved to file. Press enter to continue.{c.COLOR_NORMAL}")
         return True
 
+    @instruments.timed
+    def append_journal(self):
+# writes only the records changed since the last save, in the order they were read or added
+        counter_deltas = self.counter_buffer.take()
+        try:
+            self.write_journal_entries(counter_deltas)
+        except OSError:
+            self.counter_buffer.put_back(counter_deltas)
+            raise
+        self.dirty_keys = set()
+
+    def write_journal_entries(self,counter_deltas):
+        self.renumber_new_records(self.read_stored_max_id(),counter_deltas)
+        to_delete = []
+        with open(self.journal_file_path, "a", newline="") as journal_file:
+            writer = csv.writer(journal_file,delimiter=c.CSV_FILE_DELIMITER)
+            for key in sorted(self.dirty_keys):
+                record = self.data[key]
+                if record["Status"] == c.REC_STATUS_DELETED:
+                    to_delete.append(key)
+                    writer.writerow([c.JOURNAL_OP_DELETE, key])
+                    self.journal_entries += 1
+                    continue
+# counters of new records are written without this session's increments, which follow as counter entries
+                row = self.record_to_row(key,record)
+                for idx, delta in enumerate(counter_deltas.get(key, ())):
+                    row[self.data_headers.index(self.counter_fields[idx])] -= delta
+                writer.writerow([c.JOURNAL_OP_UPDATE] + row)
+                record["Status"] = c.REC_STATUS_ACTIVE
+                self.journal_entries += 1
+            for key, deltas in counter_deltas.items():
+                if key in self.data and self.data[key]["Status"] != c.REC_STATUS_DELETED:
+                    writer.writerow([c.JOURNAL_OP_COUNTERS, key] + deltas)
+                    self.journal_entries += 1
+            writer.writerow([c.JOURNAL_OP_META, self.max_id, self.file_time_stamp, self.file_user])
+            self.journal_entries += 1
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        self.remove_deleted_records(to_delete)
+
+    @instruments.timed
+    def compact_file(self):
+# folds csv file and journal (which now also holds our own changes) into a new csv file; the caller has to hold
+# the file lock
+        self.load_file()
+        temp_file_path = f"{self.data_file_path}.tmp"
+        with open(temp_file_path, "w", newline="") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=self.data_headers,delimiter=c.CSV_FILE_DELIMITER)
+            writer.writeheader()
+            data_settings = [self.max_id, self.file_time_stamp, self.file_user] + ['Unused']*(len(self.data_headers)-3)
+            writer.writerow(dict(zip(self.data_headers, data_settings)))
+            for key, record in self.data.items():
+                writer.writerow(dict(zip(self.data_headers, self.record_to_row(key,record))))
+            csvfile.flush()
+            os.fsync(csvfile.fileno())
+        if os.path.exists(self.journal_file_path):
+            os.replace(self.journal_file_path, f"{self.journal_file_path}.old")
+        os.replace(temp_file_path, self.data_file_path)
+        if os.path.exists(f"{self.journal_file_path}.old"):
+            os.remove(f"{self.journal_file_path}.old")
+        self.journal_entries = 0
+        self.write_cache()
+
+    def recover_file(self):
+# finishes or rolls back a compaction which was interrupted (e.g. by a crash); the caller has to hold the file lock
+# - temp file and old journal exist: the csv file was not replaced yet, so the old journal is still needed
+# - only the old journal exists: the csv file was replaced and already contains the old journal
+        temp_file_path = f"{self.data_file_path}.tmp"
+        old_journal_file_path = f"{self.journal_file_path}.old"
+        if os.path.exists(old_journal_file_path):
+            if os.path.exists(temp_file_path):
+                os.replace(old_journal_file_path, self.journal_file_path)
+            else:
+                os.remove(old_journal_file_path)
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+
+    def read_stored_max_id(self):
+# the highest record ID saved by anybody: from the settings row of the csv file and the journal
+        max_id = 0
+        with open(self.data_file_path, "r") as csvfile:
+            reader = csv.reader(csvfile,delimiter=c.CSV_FILE_DELIMITER)
+            next(reader, None)
+            try:
+                max_id = int(next(reader)[0])
+            except (StopIteration, IndexError, ValueError):
+                pass
+        if os.path.exists(self.journal_file_path):
+            with open(self.journal_file_path, "r", newline="") as journal_file:
+                for row in csv.reader(journal_file,delimiter=c.CSV_FILE_DELIMITER):
+                    try:
+                        if row[0] in (c.JOURNAL_OP_UPDATE, c.JOURNAL_OP_META):
+                            max_id = max(max_id, int(row[1]))
+                    except (IndexError, ValueError):
+                        continue
+        return max_id
+
+    def renumber_new_records(self,stored_max_id,counter_deltas):
+# another process may have saved new records with the IDs we gave to ours in the meantime
+        new_keys = [key for key in self.dirty_keys if self.data[key]["Status"] == c.REC_STATUS_NEW and key <= stored_max_id]
+        if len(new_keys) == 0:
+            return
+        self.max_id = stored_max_id
+        for key in sorted(new_keys):
+            self.unindex_record(key)
+            record = self.data.pop(key)
+            self.max_id = self.max_id + 1
+            self.data[self.max_id] = record
+            self.dirty_keys.discard(key)
+            self.dirty_keys.add(self.max_id)
+            if key in counter_deltas:
+                counter_deltas[self.max_id] = counter_deltas.pop(key)
+            self.index_record(self.max_id)
+            self.index_text(self.max_id)
+        self.row_keys = list(self.data)
+
+    def record_to_row(self,key,record):
+# the record as a list of values in the order of the csv file columns
+        return [key if header == "ID" else record[header] for header in self.data_headers]
+
+    def remove_deleted_records(self,to_delete):
+        for key in to_delete:
+            self.unindex_record(key)
+            del self.data[key]
+        if len(to_delete) > 0:
+            self.row_keys = list(self.data)
+
+# Counters (counter_fields) are changed only through add_counter_deltas so that the increments can be saved.
+# They do not set save_flag because counter_buffer writes them on its own; increments of records which are not
+# saved yet (and may still get another ID) are held back until the next save.
+    def add_counter_deltas(self,record_id,deltas):
+        record = self.data[record_id]
+        self.apply_counter_deltas(record,deltas)
+        self.counter_buffer.add(record_id,deltas,record["Status"] == c.REC_STATUS_NEW)
+
+    def apply_counter_deltas(self,record,deltas):
+        for idx, field in enumerate(self.counter_fields):
+            record[field] += deltas[idx]
+
     def read_record_from_file(self,record):
         try:
             record_id = int(record.pop("ID"))
+            record = self.to_record(record)
             record["Status"] = c.REC_STATUS_ACTIVE
             self.data[record_id] = record
             self.max_id = record_id
         except Exception as e:
-            print(f"{c.COLOR_WARNING}There was an error reading this record:{c.COLOR_NORMAL}")
-            print("Exception occurred:", type(e))
-            print(self.data_headers)     
-            print(record)
-            if input(f"{c.COLOR_INPUT}Do you want to continue reading this file or abort the program? c/a:{c.COLOR_NORMAL} ").lower() == "a":
-                sys.exit(1)
+            self.read_failed = True
+            if self.read_errors != None:
+                self.read_errors.append((e, record))
+            else:
+                self.report_read_errors([(e, record)])
+
+    def report_read_errors(self,read_errors):
+# read_errors: (exception, record) for every record which could not be read; asks whether to go on
+        for e, record in read_errors:
+            screen.print(f"{c.COLOR_WARNING}There was an error reading this record:{c.COLOR_NORMAL}")
+            screen.print("Exception occurred:", type(e))
+            screen.print(self.data_headers)     
+            screen.print(record)
+        if screen.input(f"{c.COLOR_INPUT}Do you want to continue reading this file or abort the program? c/a:{c.COLOR_NORMAL} ").lower() == "a":
+            sys.exit(1)
 
 # Data record handling
 # These functions add, update, delete and find records in the data list in memory. 
 # The values in the records are prepared in the subclasses and passed to these functions.
 # These functions also take care of save_flag and max_id handling.
     def add_record(self,in_record):
+        in_record = self.to_record(in_record)
         self.max_id = self.max_id + 1
         in_record["Status"] = c.REC_STATUS_NEW
         self.data[self.max_id] = in_record
+        self.dirty_keys.add(self.max_id)
+        self.row_keys.append(self.max_id)
+        self.index_record(self.max_id)
+        self.index_text(self.max_id)
+        self.save_flag = True
+
+    def add_records(self,in_records):
+# bulk version of add_record (e.g. for imports): the records get the next IDs in their order and the indexes are
+# built once at the end
+        for in_record in in_records:
+            in_record = self.to_record(in_record)
+            self.max_id = self.max_id + 1
+            in_record["Status"] = c.REC_STATUS_NEW
+            self.data[self.max_id] = in_record
+            self.dirty_keys.add(self.max_id)
+        self.build_indexes()
         self.save_flag = True
 
 # delete_record here actually is designed habing in mind only the user database as we never ever plan to delete 
@@ -206,55 +530,187 @@ class DataHandler(ABC):
         if record_id == None:
             return parent_window + c.EVENT_VIEW_ITEMS
         if record_id == 1:
-            input(f"{c.COLOR_WARNING}Felicia is stronger than you. You cannot simply delete her! :){c.COLOR_NORMAL}")
+            screen.input(f"{c.COLOR_WARNING}Felicia is stronger than you. You cannot simply delete her! :){c.COLOR_NORMAL}")
             return parent_window + c.EVENT_VIEW_ITEMS
-        if input(f"{c.COLOR_INPUT}Do you really want to delete user nr. {record_id}? (y/n):{c.COLOR_NORMAL} ").lower() == "y":
+        if screen.input(f"{c.COLOR_INPUT}Do you really want to delete user nr. {record_id}? (y/n):{c.COLOR_NORMAL} ").lower() == "y":
             self.data[record_id]["Status"] = c.REC_STATUS_DELETED
+            self.unindex_record(record_id)
+            self.dirty_keys.add(record_id)
             self.save_flag = True
         return parent_window + c.EVENT_VIEW_ITEMS
         
     def update_record(self,record_id,record):
         if record_id in self.data:
+            record = self.to_record(record)
             record["Status"] = c.REC_STATUS_UPDATED
             self.data[record_id] = record
+            self.index_record(record_id)
+            self.index_text(record_id, True)
+            self.dirty_keys.add(record_id)
             self.save_flag = True
             return
-        print(f"{c.COLOR_WARNING}ERROR: Record to be updated not found.{c.COLOR_NORMAL}")
+        screen.print(f"{c.COLOR_WARNING}ERROR: Record to be updated not found.{c.COLOR_NORMAL}")
+
+    def to_record(self,record):
+        return record if type(record) == self.record_class else self.record_class(record)
 
     def fetch_record_by_key(self,key_name,key_value):
+        if key_name in self.index_fields:
+            for record_id in self.fetch_ids_by_key(key_name,key_value):
+                return record_id,self.data[record_id]
+            return 0,None
         for key,record in self.data.items():
             if record[key_name] == key_value:
                 return key,record
         return 0,None
 
+# Secondary indexes
+# row_keys is the positional index: the record IDs in the order of data, so that a page can be cut out without
+# copying the whole OrderedDict. It is appended to in add_record and rebuilt when deleted records are removed.
+# indexes maps each field in index_fields to a dict: field value -> record ID (unique index) or
+# field value -> set of record IDs (non-unique index).
+# views holds the DataViews opened so far (key in view_definitions -> DataView); each of them is updated together
+# with the indexes, record by record.
+# indexed_values remembers the values each record was indexed under (a tuple in the order of index_fields, which
+# is much smaller than a dict per record). Records are usually changed in place
+# before update_record is called, so without it we could not find the old index entries anymore.
+    def build_indexes(self):
+        self.row_keys = list(self.data)
+        self.indexes = {field: {} for field in self.index_fields}
+        self.indexed_values = {}
+        self.search_index = None
+        if getattr(self, "views", None) == None:
+            self.views = {}
+        for view in self.views.values():
+            view.clear()
+        for record_id in self.data:
+            self.index_record(record_id)
+
+    def index_record(self,record_id):
+        self.unindex_record(record_id)
+        record = self.data[record_id]
+        values = tuple([record[field] for field in self.index_fields])
+        for field, value in zip(self.index_fields, values):
+            if self.index_fields[field]:
+                self.indexes[field][value] = record_id
+            else:
+                self.indexes[field].setdefault(value, set()).add(record_id)
+        self.indexed_values[record_id] = values
+        for view in self.views.values():
+            view.add(record_id, record)
+
+    def unindex_record(self,record_id):
+        for view in self.views.values():
+            view.remove(record_id)
+        values = self.indexed_values.pop(record_id, None)
+        if values == None:
+            return
+        for field, value in zip(self.index_fields, values):
+            if self.index_fields[field]:
+                if self.indexes[field].get(value) == record_id:
+                    del self.indexes[field][value]
+            else:
+                record_ids = self.indexes[field][value]
+                record_ids.discard(record_id)
+                if len(record_ids) == 0:
+                    del self.indexes[field][value]
+
+    def fetch_ids_by_key(self,key_name,key_value):
+# returns the set of IDs of all records with record[key_name] == key_value
+        if key_name not in self.index_fields:
+            return {key for key,record in self.data.items() if record[key_name] == key_value}
+        if self.index_fields[key_name]:
+            record_id = self.indexes[key_name].get(key_value)
+            return set() if record_id == None else {record_id}
+        return set(self.indexes[key_name].get(key_value, ()))
+
+# Search
+# search_index (SearchIndex over search_fields) is only built for the first search, because splitting the texts of a
+# big file into words takes a while; afterwards index_text adds every added or changed record to it. It is dropped
+# (and built again when needed) whenever the indexes are built again.
+# index_text is called for added (changed = False) and updated records (changed = True); subclasses can extend it
+# to keep their own text indexes up to date.
+    def index_text(self,record_id,changed=False):
+        if self.search_index == None:
+            return
+        if changed:
+            self.search_index.update(record_id, self.data[record_id])
+        else:
+            self.search_index.add(record_id, self.data[record_id])
+
+    def get_search_index(self):
+        if self.search_index == None:
+            self.search_index = SearchIndex(self.search_fields)
+            for record_id, record in self.data.items():
+                self.search_index.add(record_id, record)
+        return self.search_index
+
+    @instruments.timed
+    def search(self,query):
+# returns the IDs of the records containing all words of query, best match first
+        return [record_id for record_id in self.get_search_index().search(query, self.data) if self.data[record_id]["Status"] != c.REC_STATUS_DELETED]
+
     def ask_for_id(self):
         while True:
-            str = input(f"{c.COLOR_INPUT}Enter ID:{c.COLOR_NORMAL} ")
+            str = screen.input(f"{c.COLOR_INPUT}Enter ID:{c.COLOR_NORMAL} ")
             if str.lower() == "q":
                 return None
             try:
                 record_id = int(str)
             except ValueError:
-                print(f"{c.COLOR_WARNING}Please enter a valid ID.{c.COLOR_NORMAL}")
+                screen.print(f"{c.COLOR_WARNING}Please enter a valid ID.{c.COLOR_NORMAL}")
                 continue
             if record_id in self.data:
                 return record_id
-            print(f"{c.COLOR_WARNING}ID does not exist.{c.COLOR_NORMAL}")
+            screen.print(f"{c.COLOR_WARNING}ID does not exist.{c.COLOR_NORMAL}")
 
 # Some window handling stuff
     def step_to_page(self,step):
         if self.current_page + step > self.total_pages:
             self.current_page = self.total_pages
         elif self.current_page + step < 1:
-            self.current_page = 0 if self.data_rows == 0 else 1
+            self.current_page = 0 if self.page_rows == 0 else 1
         else:
             self.current_page = self.current_page + step
 
+    def get_page_items(self,start_row,end_row):
+        keys = self.row_keys if self.view_keys == None else self.view_keys
+        return [(key, self.data[key]) for key in keys[start_row:end_row]]
+
+    def set_view(self,view_keys,view_title=""):
+# view_keys = None shows all records again
+        self.view_keys = view_keys
+        self.view_title = view_title
+        self.current_page = 1
+
+    def get_view(self,view_name):
+# the view is built once with a pass over all records, afterwards it is kept up to date by the indexing
+        if view_name not in self.views:
+            view = DataView(*self.view_definitions[view_name])
+            view.clear()
+            for record_id in self.indexed_values:
+                view.add(record_id, self.data[record_id])
+            self.views[view_name] = view
+        return self.views[view_name]
+
+    def choose_view(self):
+        screen.print(" | ".join([f"{key} - {definition[0]}" for key, definition in self.view_definitions.items()] + ["Enter - all records"]))
+        while True:
+            view_name = screen.input(f"{c.COLOR_INPUT}Choose a view:{c.COLOR_NORMAL} ").upper()
+            if view_name == "":
+                self.set_view(None)
+                return
+            if view_name in self.view_definitions:
+                view = self.get_view(view_name)
+                self.set_view(view, view.title)
+                return
+            screen.print(f"{c.COLOR_WARNING}Please choose a valid view.{c.COLOR_NORMAL}")
+
     def print_empty_rows(self,rows):
         if rows == 0:
             return
         for idx in range(rows):
-            print(f"│ " + " " * (self.window_size - 3) + "│")
+            screen.print(f"│ " + " " * (self.window_size - 3) + "│")
 
 # This is the ui action handler. It's here because it looks (almost) the same for any object.
 # It returns the window event combination:
@@ -262,9 +718,9 @@ class DataHandler(ABC):
 # - the action we want to perform next (add,edit, delete etc.)
     def ask_action(self,parent_window,valid_keys):
         while True:
-            str = input(f"{c.COLOR_INPUT}Input action key:{c.COLOR_NORMAL} ").upper()
+            str = screen.input(f"{c.COLOR_INPUT}Input action key:{c.COLOR_NORMAL} ").upper()
             if str not in valid_keys.upper():
-                print(f"{c.COLOR_WARNING}Please enter a valid action key.{c.COLOR_NORMAL}")
+                screen.print(f"{c.COLOR_WARNING}Please enter a valid action key.{c.COLOR_NORMAL}")
                 continue
             match str:
                 case "A":
@@ -289,8 +745,29 @@ class DataHandler(ABC):
                     return parent_window + c.EVENT_VIEW_ITEMS
                 case "S":
                     return parent_window + c.EVENT_SAVE_ITEMS
+                case "V":
+                    self.choose_view()
+                    return parent_window + c.EVENT_VIEW_ITEMS
+                case "/":
+                    query = screen.input(f"{c.COLOR_INPUT}Search for (empty to show all):{c.COLOR_NORMAL} ").strip()
+                    if query == "":
+                        self.set_view(None)
+                    else:
+                        self.set_view(self.search(query), f'search "{query}"')
+                    return parent_window + c.EVENT_VIEW_ITEMS
                 case "Q":
+                    self.set_view(None)
                     if self.save_flag == False:
                         self.current_page = 1
                         return c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
                     return parent_window + c.EVENT_SAVE_ITEMS
+
+def append_counter_entries(journal_file_path,deltas):
+# write function of the counter buffers: appends counter entries for {record ID: increments}; the caller has to
+# hold the file lock
+    with open(journal_file_path, "a", newline="") as journal_file:
+        writer = csv.writer(journal_file,delimiter=c.CSV_FILE_DELIMITER)
+        for key, record_deltas in deltas.items():
+            writer.writerow([c.JOURNAL_OP_COUNTERS, key] + record_deltas)
+        journal_file.flush()
+        os.fsync(journal_file.fileno())
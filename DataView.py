@@ -0,0 +1,46 @@
+from RankedIndex import RankedIndex
+
+"""DataView
+A filtered and sorted view of the records of a DataHandler (e.g. "disabled questions" or "admins"), kept as a
+RankedIndex of the sort keys of the records which match condition:
+    view = DataView("disabled questions", lambda record: record["Flag"] == 0)
+    view.add(record_id, record)        # called by DataHandler.index_record for every record
+    view.remove(record_id)             # called by DataHandler.unindex_record
+    len(view), view[10:20]             # number of records, IDs of a page
+DataHandler keeps the views which were opened up to date with every change of a record, so switching to a view or
+paging through it never goes through all records. sort_key(record_id, record) returns a tuple ending with the
+record ID; without it the records are sorted by ID.
+"""
+
+class DataView:
+    def __init__(self, title, condition, sort_key=None):
+        self.title = title
+        self.condition = condition
+        self.sort_key = sort_key
+        self.ranking = RankedIndex()
+        self.record_keys = {}
+
+    def clear(self):
+# used before all records are indexed again: the keys are collected and only sorted when the view is shown
+        self.ranking = RankedIndex()
+        self.ranking.invalidate()
+        self.record_keys = {}
+
+    def add(self, record_id, record):
+        if not self.condition(record):
+            return
+        key = (record_id,) if self.sort_key == None else self.sort_key(record_id, record)
+        self.ranking.add(key)
+        self.record_keys[record_id] = key
+
+    def remove(self, record_id):
+        key = self.record_keys.pop(record_id, None)
+        if key != None:
+            self.ranking.remove(key)
+
+    def __len__(self):
+        return len(self.ranking)
+
+    def __getitem__(self, rows):
+# only slices (the IDs of a page) are supported
+        return [key[-1] for key in self.ranking.page(rows.start or 0, len(self) if rows.stop == None else rows.stop)]
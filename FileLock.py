@@ -0,0 +1,45 @@
+import time
+import constants as c
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+"""FileLock
+Advisory lock on a lock file, used as a context manager:
+    with FileLock(path):
+        ...
+Blocks until no other process holds the lock. Uses fcntl.flock on Unix and msvcrt.locking on Windows; there
+LK_LOCK gives up (OSError) after about 10 seconds, so the lock is tried with LK_NBLCK until it is free.
+The lock is not reentrant: do not lock the same path again while holding it.
+"""
+
+class FileLock:
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.lock_file = None
+
+    def __enter__(self):
+        self.lock_file = open(self.file_path, "a+")
+        if fcntl != None:
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    self.lock_file.seek(0)
+                    msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(c.FILE_LOCK_RETRY_INTERVAL)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if fcntl != None:
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+        else:
+            self.lock_file.seek(0)
+            msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.lock_file.close()
+        self.lock_file = None
+        return False
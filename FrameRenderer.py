@@ -0,0 +1,119 @@
+import os
+import re
+import sys
+import atexit
+import shutil
+from Instrumentation import instruments
+
+"""FrameRenderer
+All terminal output of the ui goes through the one FrameRenderer instance screen:
+    screen.clear()           starts a new frame (instead of os.system("clear"), which starts a shell every time)
+    screen.print(...)        like print(), but the text is collected in a buffer
+    screen.input(prompt)     writes the buffer in one go, then asks like input()
+So a whole window (e.g. a page of the questions manager) reaches the terminal with a single write.
+The renderer remembers the lines on the screen. A new frame only rewrites the lines which differ from the last one
+(moving the cursor with ANSI escape codes), so paging through a table only sends the changed rows. If a line is
+wider or the frame higher than the terminal, or the output is not a terminal, the frame is written in full
+(cleared with ANSI escape codes on a terminal, without any escape codes otherwise).
+On Windows the console only understands ANSI escape codes once virtual terminal processing is switched on for it,
+which is done when the renderer is created; if that fails, every frame is written in full after cls.
+"""
+
+ANSI_CODE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+# Windows console API
+STD_OUTPUT_HANDLE = -11
+ENABLE_VIRTUAL_TERMINAL_PROCESSING = 0x0004
+
+class FrameRenderer:
+    def __init__(self):
+        self.buffer = []
+        self.lines = None
+        self.new_frame = False
+        self.ansi = enable_ansi()
+
+    def clear(self):
+        self.buffer = []
+        self.new_frame = True
+
+    def print(self, *values, sep=" ", end="\n"):
+        self.buffer.append(sep.join(str(value) for value in values) + end)
+
+    def input(self, prompt=""):
+        self.print(prompt, end="")
+        self.flush()
+        with instruments.waiting():
+            answer = input()
+# the answer was echoed by the terminal and the enter key moved the cursor to the next line
+        self.track(answer + "\n")
+        return answer
+
+    @instruments.timed
+    def flush(self):
+        text = "".join(self.buffer)
+        self.buffer = []
+        stream = sys.stdout
+        if self.new_frame:
+            self.new_frame = False
+            text = self.render_frame(text, stream.isatty())
+        else:
+            self.track(text)
+        stream.write(text)
+        stream.flush()
+
+    def track(self, text):
+# adds text written behind the frame to the remembered lines; once the screen scrolls or a line wraps, the lines
+# are not where we think anymore and the next frame is written in full
+        if self.lines == None:
+            return
+        rows = text.split("\n")
+        self.lines[-1] += rows[0]
+        self.lines.extend(rows[1:])
+        if not self.fits(self.lines):
+            self.lines = None
+
+    def fits(self, rows):
+        columns, height = shutil.get_terminal_size()
+        return len(rows) <= height and all(len(ANSI_CODE.sub("", row)) < columns for row in rows)
+
+    def render_frame(self, text, is_terminal):
+# returns what has to be written to turn the lines on the screen into the new frame
+        rows = text.split("\n")
+        old_rows, self.lines = self.lines, rows
+        if not is_terminal:
+            self.lines = None
+            return text
+        if not self.ansi:
+            self.lines = None
+            os.system("cls")
+            return text
+        if not self.fits(rows):
+            self.lines = None
+            return "\x1b[H\x1b[2J" + text
+        if old_rows == None:
+            return "\x1b[H\x1b[2J" + text
+        output = []
+        for idx, row in enumerate(rows[:-1]):
+            if idx >= len(old_rows) or old_rows[idx] != row:
+                output.append(f"\x1b[{idx + 1};1H{row}\x1b[K")
+# the cursor ends up behind the last (unfinished) row, everything below it is cleared
+        output.append(f"\x1b[{len(rows)};1H{rows[-1]}\x1b[J")
+        return "".join(output)
+
+def enable_ansi():
+# returns True if the terminal understands ANSI escape codes (always on Unix; on Windows after switching on
+# ENABLE_VIRTUAL_TERMINAL_PROCESSING for the console of stdout)
+    if os.name != "nt":
+        return True
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(STD_OUTPUT_HANDLE)
+        mode = ctypes.c_ulong()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        return bool(kernel32.SetConsoleMode(handle, mode.value | ENABLE_VIRTUAL_TERMINAL_PROCESSING))
+    except (ImportError, AttributeError, OSError):
+        return False
+
+screen = FrameRenderer()
+atexit.register(screen.flush)
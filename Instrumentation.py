@@ -0,0 +1,117 @@
+import os
+import time
+import atexit
+import datetime
+import functools
+import threading
+import constants as c
+
+"""Instrumentation
+Opt-in timing of where the program spends its time. It is switched on by c.DEBUG_FLAG or by setting the environment
+variable named in c.INSTRUMENTATION_ENV_VAR (e.g. QTEST_INSTRUMENT=1 python qtest.py); otherwise it costs nothing,
+because timed returns the functions unchanged.
+    @instruments.timed                          # every call of the function is timed under its qualified name
+    with instruments.measure("dispatch ..."):   # times a block, e.g. one window event of the main loop
+    with instruments.waiting():                 # time spent waiting for the user (FrameRenderer.input)
+Time spent waiting for the user is not counted: a measurement subtracts the waiting which happened on its thread while
+it ran, so a window event shows the work done for it, not how long the user took to type.
+At exit, the number of calls, total and percentiles (50, 90, 99) and maximum per name are appended to
+c.INSTRUMENTATION_FILENAME in the Data folder.
+"""
+
+class Instrumentation:
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.timings = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        if enabled:
+            atexit.register(self.write_stats)
+
+    def timed(self, function):
+        if not self.enabled:
+            return function
+        @functools.wraps(function)
+        def timed_function(*args, **kwargs):
+            with self.measure(function.__qualname__):
+                return function(*args, **kwargs)
+        return timed_function
+
+    def measure(self, name):
+        return Measurement(self, name) if self.enabled else NO_MEASUREMENT
+
+    def waiting(self):
+        return Waiting(self) if self.enabled else NO_MEASUREMENT
+
+    def get_waiting_time(self):
+        return getattr(self.local, "waiting_time", 0.0)
+
+    def add(self, name, duration):
+        with self.lock:
+            self.timings.setdefault(name, []).append(duration)
+
+    def write_stats(self):
+        if len(self.timings) == 0:
+            return
+        lines = [f"qtest {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} (process {os.getpid()})",
+                 "Event".ljust(50) + "    Calls   Total ms     p50 ms     p90 ms     p99 ms     Max ms"]
+        with self.lock:
+            timings = sorted(self.timings.items())
+        for name, durations in timings:
+            durations = sorted(durations)
+            values = [sum(durations)] + [percentile(durations, share) for share in (50, 90, 99)] + [durations[-1]]
+            lines.append(name[:50].ljust(50) + f"{len(durations):9d}" + "".join(f"{value * 1000:11.3f}" for value in values))
+        try:
+            with open(f"{c.DATA_FOLDER}/{c.INSTRUMENTATION_FILENAME}", "a") as stats_file:
+                stats_file.write("\n".join(lines) + "\n\n")
+        except OSError:
+            pass
+
+class Measurement:
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.waiting_time = self.instrumentation.get_waiting_time()
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter() - self.start - (self.instrumentation.get_waiting_time() - self.waiting_time)
+        self.instrumentation.add(self.name, duration)
+
+class Waiting:
+    def __init__(self, instrumentation):
+        self.instrumentation = instrumentation
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        local = self.instrumentation.local
+        local.waiting_time = getattr(local, "waiting_time", 0.0) + time.perf_counter() - self.start
+
+class NoMeasurement:
+# stands in for Measurement and Waiting when the instrumentation is off
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+NO_MEASUREMENT = NoMeasurement()
+
+def percentile(sorted_values, share):
+# nearest-rank percentile of a sorted list
+    return sorted_values[max(0, -(-len(sorted_values) * share // 100) - 1)]
+
+WINDOW_NAMES = {value: name for name, value in vars(c).items() if name.startswith("WINDOW_") and name != "WINDOW_EXTRACTOR"}
+EVENT_NAMES = {value: name for name, value in vars(c).items() if name.startswith("EVENT_") and name != "EVENT_EXTRACTOR"}
+
+def get_event_name(window_event):
+# e.g. 501 -> "WINDOW_QMANAGER + EVENT_VIEW_ITEMS"
+    window_id = window_event // c.WINDOW_EXTRACTOR * c.WINDOW_EXTRACTOR
+    event_id = window_event % c.EVENT_EXTRACTOR
+    return f"{WINDOW_NAMES.get(window_id, window_id)} + {EVENT_NAMES.get(event_id, event_id)}"
+
+instruments = Instrumentation(c.DEBUG_FLAG or os.environ.get(c.INSTRUMENTATION_ENV_VAR, "") not in ("", "0"))
@@ -0,0 +1,131 @@
+import os
+import csv
+import random
+from FileLock import FileLock
+from DataHandler import append_counter_entries
+from TopicCatalog import to_int
+from Instrumentation import instruments
+import constants as c
+
+"""MixedTestSampler
+Draws the questions of a mixed test from all topic files without loading any topic:
+- every topic file is read once, row by row, together with its journal (read first; it is short because it is
+  compacted regularly), and only the enabled questions are passed on
+- the sample is taken with reservoir sampling: the first question_count questions fill the reservoir, every later
+  question replaces a random one with the chance that makes every question equally likely
+- uniform: one reservoir over the questions of all topics, so a big topic gets more questions than a small one
+- per topic: the test is split evenly between the topics (topics with fewer enabled questions give what they have
+  and the others make up for it) and every topic gets its own reservoir
+Only the reservoirs are kept in memory, so the memory needed depends on the test size, not on the size of the topics.
+The questions are returned as dicts with Topic, ID and the question fields.
+write_counter_deltas appends the answers of a mixed test to the journals of the topics as counter entries, just
+like the counter buffer of a loaded topic does.
+"""
+
+class MixedTestSampler:
+    def __init__(self, topic_names, rng=random):
+        self.topic_names = topic_names
+        self.rng = rng
+
+    @instruments.timed
+    def sample(self, question_count, enabled_counts=None):
+# enabled_counts (topic name -> number of enabled questions, e.g. from the TopicCatalog) is only needed for a sample
+# per topic; without it the sample is uniform over all questions
+        if enabled_counts == None:
+            reservoir = Reservoir(question_count, self.rng)
+            for topic_name in self.topic_names:
+                for record in self.iterate_enabled_questions(topic_name):
+                    reservoir.add(record)
+            records = reservoir.items
+        else:
+            records = []
+            for topic_name, topic_count in split_evenly(question_count, enabled_counts, self.rng).items():
+                reservoir = Reservoir(topic_count, self.rng)
+                if topic_count > 0:
+                    for record in self.iterate_enabled_questions(topic_name):
+                        reservoir.add(record)
+                records.extend(reservoir.items)
+        self.rng.shuffle(records)
+        return [dict([("Topic", topic_name)] + list(zip(headers, row))) for topic_name, headers, row in records]
+
+    def iterate_enabled_questions(self, topic_name):
+# yields the enabled questions of a topic as (topic name, headers, row), the way they are after the journal
+        with FileLock(f"{c.DATA_FOLDER}/{topic_name}.lock"):
+            with open(f"{c.DATA_FOLDER}/{topic_name}.csv", "r", newline="") as csvfile:
+                reader = csv.reader(csvfile,delimiter=c.CSV_FILE_DELIMITER)
+                headers = next(reader, [])
+                if "ID" not in headers or "Flag" not in headers:
+                    return
+                id_column, flag_column = headers.index("ID"), headers.index("Flag")
+                changed_rows = read_journal_rows(topic_name, len(headers))
+                next(reader, None)
+                for row in reader:
+                    if len(row) != len(headers):
+                        continue
+                    record_id = to_int(row[id_column])
+                    if record_id in changed_rows:
+                        row = changed_rows.pop(record_id)
+                        if row == None:
+                            continue
+                    if to_int(row[flag_column]) == c.FLAG_ENABLED:
+                        yield topic_name, headers, row
+# questions added since the last compaction are only in the journal
+            for record_id, row in changed_rows.items():
+                if row != None and to_int(row[flag_column]) == c.FLAG_ENABLED:
+                    yield topic_name, headers, row
+
+def read_journal_rows(topic_name, columns):
+# record ID -> last journal row of the record (None if it was deleted); the counter entries are not needed
+    changed_rows = {}
+    try:
+        with open(f"{c.DATA_FOLDER}/{topic_name}.journal", "r", newline="") as journal_file:
+            for row in csv.reader(journal_file,delimiter=c.CSV_FILE_DELIMITER):
+                if len(row) < 2:
+                    continue
+                if row[0] == c.JOURNAL_OP_UPDATE and len(row) == columns + 1:
+                    changed_rows[to_int(row[1])] = row[1:]
+                elif row[0] == c.JOURNAL_OP_DELETE:
+                    changed_rows[to_int(row[1])] = None
+    except FileNotFoundError:
+        pass
+    return changed_rows
+
+def split_evenly(question_count, enabled_counts, rng):
+# topic name -> number of questions of the topic in the test
+    counts = {topic_name: 0 for topic_name in enabled_counts}
+    open_topics = [topic_name for topic_name in enabled_counts if enabled_counts[topic_name] > 0]
+    remaining = min(question_count, sum(enabled_counts.values()))
+    while remaining > 0:
+        share, extra = divmod(remaining, len(open_topics))
+        lucky_topics = set(rng.sample(open_topics, extra))
+        for topic_name in list(open_topics):
+            count = min(share + (1 if topic_name in lucky_topics else 0), enabled_counts[topic_name] - counts[topic_name])
+            counts[topic_name] += count
+            remaining -= count
+            if counts[topic_name] == enabled_counts[topic_name]:
+                open_topics.remove(topic_name)
+    return counts
+
+def write_counter_deltas(topic_name, deltas):
+# deltas: record ID -> [Asked, Answered] increments
+    if len(deltas) > 0:
+        with FileLock(f"{c.DATA_FOLDER}/{topic_name}.lock"):
+            if os.path.exists(f"{c.DATA_FOLDER}/{topic_name}.csv"):
+                append_counter_entries(f"{c.DATA_FOLDER}/{topic_name}.journal", deltas)
+
+class Reservoir:
+# reservoir sampling (algorithm R): keeps a uniform random sample of size items of everything added
+    def __init__(self, size, rng):
+        self.size = size
+        self.rng = rng
+        self.items = []
+        self.seen = 0
+
+    def add(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+            return
+        idx = self.rng.randrange(self.seen)
+        if idx < self.size:
+            self.items[idx] = item
@@ -0,0 +1,52 @@
+import threading
+from QuestionHandler import QuestionHandler
+
+"""QuestionBankLoader
+Loads a QuestionHandler on a background thread and stands in for it in the meantime, so the program can show the
+login and the main menu while the topic file is still being read:
+    questions = QuestionBankLoader(topic_name, 10, 130)   # starts reading at once
+    questions.enabled_rows                                # waits until the topic is read, then asks the handler
+Every attribute access and assignment is passed on to the loaded QuestionHandler; only the first one waits.
+An exception raised while reading is raised again on the first access. Records which could not be read are
+collected by the thread and reported on the first access too, because only the main thread may ask the user whether
+to go on (and end the program with sys.exit). load_questions reads a topic the same way for other threads, e.g. the
+workers of the QuizServer.
+"""
+
+class QuestionBankLoader:
+    def __init__(self, topic_name, rows_per_page, window_size):
+        object.__setattr__(self, "_questions", None)
+        object.__setattr__(self, "_error", None)
+        object.__setattr__(self, "_thread", threading.Thread(target=self._load, args=(topic_name, rows_per_page, window_size), daemon=True))
+        self._thread.start()
+
+    def _load(self, topic_name, rows_per_page, window_size):
+        try:
+            object.__setattr__(self, "_questions", load_questions(topic_name, rows_per_page, window_size))
+        except BaseException as e:
+            object.__setattr__(self, "_error", e)
+
+    def get_questions(self):
+# waits for the thread and returns the QuestionHandler
+        if self._questions == None or self._questions.read_errors != None:
+            self._thread.join()
+            if self._error != None:
+                raise self._error
+            read_errors = self._questions.read_errors
+            self._questions.read_errors = None
+            if len(read_errors) > 0:
+                self._questions.report_read_errors(read_errors)
+        return self._questions
+
+    def __getattr__(self, name):
+        return getattr(self.get_questions(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.get_questions(), name, value)
+
+def load_questions(topic_name, rows_per_page, window_size):
+# reads a topic without asking the user about records which cannot be read: they are left in read_errors
+    questions = QuestionHandler.__new__(QuestionHandler)
+    questions.read_errors = []
+    questions.__init__(topic_name, rows_per_page, window_size)
+    return questions
@@ -1,7 +1,15 @@
 import random
+import sys
 from collections import OrderedDict
 from DataHandler import DataHandler
-from helper_functions import flag_to_str, score_to_str
+from WeightedSampler import WeightedSampler
+from RankedIndex import RankedIndex
+from ColumnStore import ColumnStore
+from QuestionRecord import QuestionRecord
+from TopicCatalog import get_topic_stamp
+from helper_functions import flag_to_str, score_to_str, question_text_key
+from FrameRenderer import screen
+from Instrumentation import instruments
 import constants as c
 
 """QuestionHandler: subclass of DataHandler
@@ -12,11 +20,25 @@ Implements properties and methods prescribed by DataHandler:
         (B)- shows statistics
 - does the ui stuff for adding, editing, disabling/enabling questions for (A)
 - read_file is inherited and extended with specific stuff
-- specific stuff at the end
+- specific stuff at the end, including switch_topic which keeps recently used topics loaded
 """
 
 class QuestionHandler(DataHandler):
+    index_fields = {"Flag": False, "Type": False}
+    journal_mode = True
+    counter_fields = ("Asked","Answered")
+    search_fields = ("Question","Answer_A","Answer_B","Answer_C","Answer_D")
+    view_definitions = {
+        "D": ("disabled", lambda record: record.Flag == c.FLAG_DISABLED, None),
+        "M": ("multiple choice", lambda record: record.Type == "m", None),
+        "F": ("free-form", lambda record: record.Type == "f", None),
+        "N": ("never asked", lambda record: record.Asked == 0, None),
+        "W": ("worst answered first", lambda record: record.Asked > 0, lambda record_id, record: (record.Answered / record.Asked, -record.Asked, record_id)),
+        "C": ("changed since the last save", lambda record: record.Status != c.REC_STATUS_ACTIVE, None),
+    }
+
     def __init__(self, file_name, rows_per_page, window_size):
+        self.topic_cache = OrderedDict()
         super().__init__(file_name, rows_per_page)
         self._window_size = window_size
 
@@ -43,33 +65,32 @@ class QuestionHandler(DataHandler):
 
     def paint_data_window(self,mode):
         if mode == c.WINDOW_STATS:
-            print(f"{c.COLOR_HEADER}Statistics for: {c.COLOR_INPUT}{self.data_file_name}{c.COLOR_NORMAL}")
-            print("┌" + "─" * (self.window_size - 2) + "┐")
-            print("│  Rank ID   Question" + " " * (self.window_size-43) + f"Score / total {self.current_page:2d}/{self.total_pages:2d}  │")
+            screen.print(f"{c.COLOR_HEADER}Statistics for: {c.COLOR_INPUT}{self.data_file_name}{c.COLOR_NORMAL}")
+            screen.print("┌" + "─" * (self.window_size - 2) + "┐")
+            screen.print("│  Rank ID   Question" + " " * (self.window_size-43) + f"Score / total {self.current_page:2d}/{self.total_pages:2d}  │")
         else:
-            print(f"{c.COLOR_HEADER}Questions manager for: {c.COLOR_INPUT}{self.data_file_name}{c.COLOR_NORMAL} (last updated {self.file_time_stamp} by {self.file_user})")
-            print("┌" + "─" * (self.window_size - 2) + "┐")
-            print("│  ID  Type  Question" + " " * (self.window_size-39) + f"Flag       {self.current_page:2d}/{self.total_pages:2d} │")
-        print("├" + "─" * (self.window_size - 2) + "┤")
+            screen.print(f"{c.COLOR_HEADER}Questions manager for: {c.COLOR_INPUT}{self.data_file_name}{c.COLOR_NORMAL} (last updated {self.file_time_stamp} by {self.file_user})" + (f" - {self.view_title}: {self.page_rows} questions" if self.view_keys != None else ""))
+            screen.print("┌" + "─" * (self.window_size - 2) + "┐")
+            screen.print("│  ID  Type  Question" + " " * (self.window_size-39) + f"Flag       {self.current_page:2d}/{self.total_pages:2d} │")
+        screen.print("├" + "─" * (self.window_size - 2) + "┤")
         if self.current_page == 0:
             self.print_empty_rows(self.rows_per_page)
             return
         start_row = (self.current_page - 1) * self.rows_per_page
         end_row = self.current_page * self.rows_per_page
-        if end_row > self.data_rows:
-            end_row = self.data_rows    
+        if end_row > self.page_rows:
+            end_row = self.page_rows
         if mode == c.WINDOW_STATS:
-            sorted_keys = self.get_sorted_key_list()
-            for rank, key in enumerate(sorted_keys[start_row:end_row]):
+            for rank, key in enumerate(self.get_sorted_key_page(start_row,end_row),start_row):
                 record = self.data[key]
                 this_flag = "enabled " if record["Flag"] == c.FLAG_ENABLED else "disabled"
                 this_score = score_to_str(record["Answered"],record["Asked"])
-                print(f"│ {rank+1:3d}. [{key:3d}] {record['Question'].ljust(self.window_size - 39)} " + f"{this_score}".rjust(8) + f" / {record['Asked']}".ljust(5) + f" {this_flag}  │")
+                screen.print(f"│ {rank+1:3d}. [{key:3d}] {record['Question'].ljust(self.window_size - 39)} " + f"{this_score}".rjust(8) + f" / {record['Asked']}".ljust(5) + f" {this_flag}  │")
         else:
-            for key, record in list(self.data.items())[start_row:end_row]:
+            for key, record in self.get_page_items(start_row,end_row):
                 this_type = "Free" if record["Type"] == "f" else "Mult"
                 this_flag = "enabled " if record["Flag"] == c.FLAG_ENABLED else "disabled"
-                print(f"│ {key:3d}. {this_type}  {record['Question'].ljust(self.window_size - 33)}  {this_flag} {record['Status'].ljust(7)} │")
+                screen.print(f"│ {key:3d}. {this_type}  {record['Question'].ljust(self.window_size - 33)}  {this_flag} {record['Status'].ljust(7)} │")
         self.print_empty_rows(self.rows_per_page - (end_row - start_row))
 
     def add_item(self):       
@@ -77,13 +98,13 @@ class QuestionHandler(DataHandler):
         if record == None:
             return c.WINDOW_QMANAGER + c.EVENT_VIEW_ITEMS
 
-        if input(f"{c.COLOR_INPUT}Review question and decide if you want to save it (y/n):{c.COLOR_NORMAL} ").lower() == "y":
+        if screen.input(f"{c.COLOR_INPUT}Review question and decide if you want to save it (y/n):{c.COLOR_NORMAL} ").lower() == "y":
             record["Status"] = c.REC_STATUS_NEW
             record["Flag"] = c.FLAG_ENABLED
             record["Asked"]=0
             record["Answered"]=0
-            record["Score"] = score_to_str(0,0)
             self.add_record(record)
+            self.set_view(None)
             self.current_page = self.total_pages
         return c.WINDOW_QMANAGER + c.EVENT_VIEW_ITEMS
 
@@ -91,13 +112,14 @@ class QuestionHandler(DataHandler):
         record_id = self.ask_for_id()
         if record_id == None:
             return c.WINDOW_QMANAGER + c.EVENT_VIEW_ITEMS
-        record = self.data[record_id]
+# a copy is edited, so the question and its entries in the indexes stay as they are unless the update is confirmed
+        record = self.data[record_id].copy()
 
-        record = self.input_question(c.EDIT_MODE_EDIT,record)
+        record = self.input_question(c.EDIT_MODE_EDIT,record,record_id)
         if record == None:
             return c.WINDOW_QMANAGER + c.EVENT_VIEW_ITEMS
 
-        if input(f"{c.COLOR_INPUT}Do you really want to update this question? (y/n):{c.COLOR_NORMAL} ").lower() == "y":
+        if screen.input(f"{c.COLOR_INPUT}Do you really want to update this question? (y/n):{c.COLOR_NORMAL} ").lower() == "y":
             record["Status"] = c.REC_STATUS_UPDATED
             self.update_record(record_id,record)
         return c.WINDOW_QMANAGER + c.EVENT_VIEW_ITEMS
@@ -109,43 +131,158 @@ class QuestionHandler(DataHandler):
         record = self.data[record_id]
 
         if record["Flag"] == c.FLAG_ENABLED:
-            if input(f"{c.COLOR_INPUT}Do you want to disable question nr. {record_id}? (y/n):{c.COLOR_NORMAL} ").lower() == "y":
+            if screen.input(f"{c.COLOR_INPUT}Do you want to disable question nr. {record_id}? (y/n):{c.COLOR_NORMAL} ").lower() == "y":
                 record["Flag"] = c.FLAG_DISABLED
                 self.update_record(record_id,record)
         else:
-            if input(f"{c.COLOR_INPUT}Do you want to enable question nr. {record_id}? (y/n):{c.COLOR_NORMAL} ").lower() == "y":
+            if screen.input(f"{c.COLOR_INPUT}Do you want to enable question nr. {record_id}? (y/n):{c.COLOR_NORMAL} ").lower() == "y":
                 record["Flag"] = c.FLAG_ENABLED
                 self.update_record(record_id,record)
 
         return c.WINDOW_QMANAGER + c.EVENT_VIEW_ITEMS
 
 # DataHandler has a generic read_file for users and questions database. 
-# But questions has more fields which are handled here after super().read_file()
-    def read_file(self):
-        super().read_file()
-        for key, record in self.data.items():
-            try:
-                record["Flag"] = int(record["Flag"])
-            except:
-                record["Flag"] = int(0)
-            try:
-                record["Asked"] = int(record["Answered"])
-            except:
-                record["Asked"] = int(0)
+# But questions have some numeric fields which are converted here before the record is stored and indexed.
+# Questions are stored as QuestionRecord instead of dict to keep large question banks small; Type and Correct
+# are interned in to_record, so equal values share one string. The indexing code below reads the record fields as
+# attributes, which is faster than record["..."] for the many records of a bulk load.
+    record_class = QuestionRecord
+
+    def read_record_from_file(self,record):
+        for field in ["Flag","Asked","Answered"]:
             try:
-                record["Answered"] = int(record["Answered"])
+                record[field] = int(record[field])
             except:
-                record["Answered"] = int(0)
-            record["Score"] = score_to_str(record["Answered"],record["Asked"])
+                record[field] = int(0)
+        super().read_record_from_file(record)
+
+    def to_record(self,record):
+# QuestionRecord takes the values as they are when it is created, so Type and Correct are interned here
+        record = super().to_record(record)
+        for field in ["Type","Correct"]:
+            if isinstance(record.get(field), str):
+                record[field] = sys.intern(record[field])
+        return record
+
+# The samplers for practise and test and the ranking for statistics are kept up to date together with the
+# secondary indexes.
+# sampler holds the practise weight of every question, enabled_sampler gives all enabled questions the same chance.
+# ranking holds the statistics sort key of every question, ranking_keys the key each question is ranked under.
+# If NumPy is installed, columns (ColumnStore) holds the statistics of all questions as arrays: on reading a file
+# the weights and the ranking of all questions are computed on the arrays at once (load_columns) instead of per
+# question, and the test samples and the full statistics order come from the arrays, too. Without NumPy, columns is
+# None and everything is done per question.
+    bulk_indexing = False
+
+    @instruments.timed
+    def build_indexes(self):
+        self.sampler = WeightedSampler()
+        self.enabled_sampler = WeightedSampler()
+        self.ranking = RankedIndex()
+        self.ranking_keys = {}
+        self.duplicate_index = None
+        if ColumnStore.available:
+            self.columns = ColumnStore()
+            self.bulk_indexing = True
+            super().build_indexes()
+            self.bulk_indexing = False
+            self.load_columns()
+            return
+        self.columns = None
+        self.sampler.invalidate()
+        self.enabled_sampler.invalidate()
+        self.ranking.invalidate()
+        super().build_indexes()
+
+    def load_columns(self):
+        records = self.data.values()
+        self.columns.load(self.data, (record.Flag == c.FLAG_ENABLED and record.Status != c.REC_STATUS_DELETED for record in records),
+                          (record.Asked for record in records), (record.Answered for record in records))
+        ids, weights, enabled_weights = self.columns.sampler_weights()
+        self.sampler.load(ids.tolist(), weights.tolist())
+        self.enabled_sampler.load(self.sampler.keys, enabled_weights.tolist())
+        rates, asked, ids = self.columns.ranking_columns()
+        ids = ids.tolist()
+        ranking_keys = list(zip(rates.tolist(), asked.tolist(), ids))
+        self.ranking.rebuild(ranking_keys)
+        self.ranking_keys = dict(zip(ids, ranking_keys))
+
+    def index_record(self,record_id):
+        super().index_record(record_id)
+        if self.bulk_indexing:
+            return
+        record = self.data[record_id]
+        enabled = record.Flag == c.FLAG_ENABLED and record.Status != c.REC_STATUS_DELETED
+        self.sampler.set_weight(record_id, self.get_practise_weight(record) if enabled else 0)
+        self.enabled_sampler.set_weight(record_id, 1 if enabled else 0)
+        self.ranking_keys[record_id] = self.get_ranking_key(record_id,record)
+        self.ranking.add(self.ranking_keys[record_id])
+        if self.columns != None:
+            self.columns.set_row(record_id, enabled, record.Asked, record.Answered)
+
+    def unindex_record(self,record_id):
+        super().unindex_record(record_id)
+        if self.columns != None:
+            self.columns.remove_row(record_id)
+        if record_id in self.sampler:
+            self.sampler.remove(record_id)
+            self.enabled_sampler.remove(record_id)
+        if record_id in self.ranking_keys:
+            self.ranking.remove(self.ranking_keys.pop(record_id))
+
+# Duplicate questions
+# duplicate_index maps the hash of question_text_key (question and answers with case, whitespace and punctuation
+# folded) to the ID of the question with that text, or to a set of IDs if there are several. It is only built when it
+# is needed for the first time (normalizing the texts of a big topic takes a few seconds, which we do not want to
+# spend on every start), afterwards index_text keeps it up to date, so a check is a single lookup.
+# Entries are not removed when a question is changed; find_duplicate compares the texts of the candidates anyway
+# and skips the ones which do not match anymore.
+    def index_text(self,record_id,changed=False):
+        super().index_text(record_id,changed)
+        self.index_duplicate(record_id)
+
+    def get_duplicate_index(self):
+        if self.duplicate_index == None:
+            self.duplicate_index = {}
+            for record_id in self.data:
+                self.index_duplicate(record_id)
+        return self.duplicate_index
+
+    def index_duplicate(self,record_id):
+        if self.duplicate_index == None:
+            return
+        key = hash(question_text_key(self.data[record_id]))
+        record_ids = self.duplicate_index.get(key)
+        if record_ids == None:
+            self.duplicate_index[key] = record_id
+        elif type(record_ids) == set:
+            record_ids.add(record_id)
+        elif record_ids != record_id:
+            self.duplicate_index[key] = {record_ids, record_id}
+
+    def find_duplicate(self,record,text_key=None,record_id=None):
+# returns the ID of another question with the same text as record (a question which is not deleted and is not record
+# itself or the question with ID record_id) or None; text_key can be passed if the caller has computed it already
+        if text_key == None:
+            text_key = question_text_key(record)
+        record_ids = self.get_duplicate_index().get(hash(text_key))
+        if record_ids == None:
+            return None
+        for other_id in sorted(record_ids) if type(record_ids) == set else [record_ids]:
+            other = self.data.get(other_id)
+            if other != None and other is not record and other_id != record_id and other.Status != c.REC_STATUS_DELETED and question_text_key(other) == text_key:
+                return other_id
+        return None
 
 #Stuff created by and used in this class
 # ui stuff used in add_item and edit_item
-    def input_question(self,mode,record):
+    def input_question(self,mode,record,record_id=None):
+# record_id is the ID of the question being edited (record is a copy of it)
         if mode == c.EDIT_MODE_EDIT:
             this_type = "free" if record['Type']=='f' else "multiple choice"
-            print(f"{c.COLOR_HEADER}Current question type:{c.COLOR_NORMAL} {this_type}", end=" - ")
+            screen.print(f"{c.COLOR_HEADER}Current question type:{c.COLOR_NORMAL} {this_type}", end=" - ")
         while True:
-            answer = input(f"{c.COLOR_INPUT}Set the answer type - free-form or multiple choice? f/m:{c.COLOR_NORMAL} ").lower()
+            answer = screen.input(f"{c.COLOR_INPUT}Set the answer type - free-form or multiple choice? f/m:{c.COLOR_NORMAL} ").lower()
             if answer == "q":
                 return None
             if answer == "":
@@ -155,8 +292,8 @@ class QuestionHandler(DataHandler):
                 break
 
         if mode == c.EDIT_MODE_EDIT:
-            print(f"{c.COLOR_HEADER}Current question text:{c.COLOR_NORMAL} {record['Question']}")
-        answer = input(f"{c.COLOR_INPUT}Question text:{c.COLOR_NORMAL} ")
+            screen.print(f"{c.COLOR_HEADER}Current question text:{c.COLOR_NORMAL} {record['Question']}")
+        answer = screen.input(f"{c.COLOR_INPUT}Question text:{c.COLOR_NORMAL} ")
         if answer.lower() == "q":
             return None
         if answer != "":
@@ -168,45 +305,120 @@ class QuestionHandler(DataHandler):
             for letter in ["A","B","C","D"]:
                 key_name = f"Answer_{letter}"
                 if mode == c.EDIT_MODE_EDIT:
-                    print(f"{c.COLOR_HEADER}Current text for choice {letter}:{c.COLOR_NORMAL} {record[key_name]}",end=" - ")
-                answer = input(f"{c.COLOR_INPUT}Set text for choice {letter}:{c.COLOR_NORMAL} ")
+                    screen.print(f"{c.COLOR_HEADER}Current text for choice {letter}:{c.COLOR_NORMAL} {record[key_name]}",end=" - ")
+                answer = screen.input(f"{c.COLOR_INPUT}Set text for choice {letter}:{c.COLOR_NORMAL} ")
                 if answer.lower() == "q":
                     return None
                 if answer != "":
                     record[key_name] = answer
         if mode == c.EDIT_MODE_EDIT:
-            print(f"{c.COLOR_HEADER}Current correct answer:{c.COLOR_NORMAL} {record['Correct']}",end=" - ")
+            screen.print(f"{c.COLOR_HEADER}Current correct answer:{c.COLOR_NORMAL} {record['Correct']}",end=" - ")
         while True:
-            record["Correct"] = input(f"{c.COLOR_INPUT}Set correct answer:{c.COLOR_NORMAL} ").upper()
+            record["Correct"] = screen.input(f"{c.COLOR_INPUT}Set correct answer:{c.COLOR_NORMAL} ").upper()
             if record["Correct"] == "Q":
                 return None
             if record["Correct"] in "ABCD" or record["Type"] == "f":
                 break
 
+        duplicate_id = self.find_duplicate(record,record_id=record_id)
+        if duplicate_id != None:
+            screen.print(f"{c.COLOR_WARNING}Question nr. {duplicate_id} has the same text:{c.COLOR_NORMAL} {self.data[duplicate_id]['Question']}")
+            if screen.input(f"{c.COLOR_INPUT}Do you want to keep this question anyway? (y/n):{c.COLOR_NORMAL} ").lower() != "y":
+                return None
         return record
  
  # 3 methods to get questions for Practise, Test your knowledge and Statistics
+# Questions which were answered wrongly more often are more likely to be asked in practise.
+    @instruments.timed
     def get_random_weighted_record_id(self):
-        weights = []
-        keys = []
-        for key, record in self.data.items():
-            if record["Flag"] == 0:
-                continue
-            keys.append(key)
-            if int(record["Asked"]) > 0:
-                weight = 1 - int(record["Answered"]) / int(record["Asked"])
-            else:
-                weight = 1
-            weights.append(weight)
-
-        if sum(weights) > 0:
-            return random.choices(keys, weights=weights, k=1)[0]
-        return random.choice(keys)
+        record_id = self.sampler.draw()
+        if record_id == None:
+            record_id = self.enabled_sampler.draw()
+        return record_id
+
+    def get_practise_weight(self,record):
+# 1 - success rate, scaled to an integer for WeightedSampler; never asked questions get the full weight
+        if record.Asked > 0:
+            return max(0, (record.Asked - record.Answered) * c.PRACTISE_WEIGHT_SCALE // record.Asked)
+        return c.PRACTISE_WEIGHT_SCALE
 
+    @property
+    def enabled_rows(self):
+        return len(self.indexes["Flag"].get(c.FLAG_ENABLED, ()))
 
+    @instruments.timed
     def get_random_key_sample(self,cnt):
-        enabled_keys = [key for key in self.data.keys() if self.data[key]['Flag'] == c.FLAG_ENABLED]
+        if self.columns != None:
+            return self.columns.sample_enabled(cnt)
+        enabled_keys = list(self.fetch_ids_by_key("Flag",c.FLAG_ENABLED))
         return random.sample(enabled_keys, cnt)
 
+# increments of (Asked, Answered) for a correct and a wrong answer
+    correct_answer_deltas = (1, 1)
+    wrong_answer_deltas = (1, 0)
+
+    def record_answer(self,record_id,correct):
+# counts an answer given in practise or test and updates the sampling weight of the question
+        self.add_counter_deltas(record_id,self.correct_answer_deltas if correct else self.wrong_answer_deltas)
+        self.index_record(record_id)
+
+# Statistics order: best success rate first, then most often asked, then by ID
+    def get_ranking_key(self,record_id,record):
+        return (0 if record.Asked == 0 else -record.Answered/record.Asked, -record.Asked, record_id)
+
+    @instruments.timed
     def get_sorted_key_list(self):
-        return sorted(self.data.keys(), key=lambda x: ((0 if self.data[x]["Asked"] == 0 else -self.data[x]["Answered"]/self.data[x]["Asked"]), -self.data[x]["Asked"]))
+        if self.columns != None:
+            return self.columns.sorted_ids()
+        return [key[-1] for key in self.ranking]
+
+    @instruments.timed
+    def get_sorted_key_page(self,start_row,end_row):
+        return [key[-1] for key in self.ranking.page(start_row,end_row)]
+
+# Switching topics
+# The loaded data of the topics used last are kept in topic_cache (least recently used first), so switching back
+# to one of them just swaps the instance attributes instead of reading the file again.
+# topic_cache holds topic name -> (attributes, user name, file stamp, estimated size in bytes). It is limited to
+# c.TOPIC_CACHE_SIZE topics and c.TOPIC_CACHE_MEMORY bytes; topics with unsaved changes are saved when they drop out.
+# A cached topic whose files were changed by another process is read again unless it has unsaved changes itself.
+    persistent_attributes = ("rows_per_page", "_window_size", "topic_cache")
+
+    def switch_topic(self,topic_name,user_name):
+        if topic_name == self.data_file_name:
+            return
+        topic_state = {key: value for key, value in self.__dict__.items() if key not in self.persistent_attributes}
+        self.topic_cache[self.data_file_name] = (topic_state, user_name, get_topic_stamp(self.data_file_name), self.estimate_memory())
+        cached_topic = self.topic_cache.pop(topic_name, None)
+        for key in topic_state:
+            del self.__dict__[key]
+        if cached_topic != None and (self.is_dirty(cached_topic[0]) or cached_topic[2] == get_topic_stamp(topic_name)):
+            self.__dict__.update(cached_topic[0])
+        else:
+            if cached_topic != None:
+                cached_topic[0]["counter_buffer"].stop()
+            self.data_file_name = topic_name
+            self.read_file()
+            self.current_page = 1
+        self.evict_topics()
+
+    def evict_topics(self):
+        while len(self.topic_cache) > c.TOPIC_CACHE_SIZE or sum(topic[3] for topic in self.topic_cache.values()) > c.TOPIC_CACHE_MEMORY:
+            topic_name, (topic_state, user_name, stamp, size) = self.topic_cache.popitem(last=False)
+            if self.is_dirty(topic_state):
+                evicted_topic = QuestionHandler.__new__(QuestionHandler)
+                evicted_topic.__dict__.update(topic_state)
+                evicted_topic.save_file(user_name,True)
+            topic_state["counter_buffer"].stop()
+
+    def is_dirty(self,topic_state):
+        return topic_state["_save_flag"] or len(topic_state["dirty_keys"]) > 0 or topic_state["counter_buffer"].has_pending()
+
+    def estimate_memory(self):
+# rough size of the loaded topic: average size of a few records (with their values) times number of records,
+# doubled for the indexes
+        sample = list(self.data.values())[:20] if self.data_rows <= 20 else [self.data[key] for key in random.sample(self.row_keys, 20)]
+        if len(sample) == 0:
+            return 0
+        record_size = sum(sys.getsizeof(record) + sum(sys.getsizeof(value) for value in record.values()) for record in sample) / len(sample)
+        return int(record_size * self.data_rows * 2)
@@ -0,0 +1,84 @@
+import sys
+import constants as c
+
+"""QuestionRecord
+Compact replacement for the dict of one question. The values live in __slots__ instead of a per-record dict,
+which saves most of the memory a dict costs for every one of possibly a million questions:
+- Flag, Asked and Answered are ints (small ints are shared by Python anyway)
+- Type and Correct are interned, so all questions with the same value share one string (also when the records
+  are loaded from the cache file, see DataHandler.read_cache)
+- Status is stored as a small number (index in status_names) and shown as the usual c.REC_STATUS_* string
+It behaves like the dict it replaces (record["Asked"], get, keys, items, copy, ...), so the code working with
+records does not have to know the difference. Unlike a dict, it only accepts the fields in fields. Code that
+only ever sees QuestionRecords (the hot paths in QuestionHandler) may read the fields as attributes (record.Asked),
+which is faster.
+"""
+
+class QuestionRecord:
+    fields = ("Type", "Question", "Answer_A", "Answer_B", "Answer_C", "Answer_D", "Correct", "Flag", "Asked", "Answered", "Status")
+    status_names = (c.REC_STATUS_ACTIVE, c.REC_STATUS_NEW, c.REC_STATUS_UPDATED, c.REC_STATUS_DELETED)
+    status_codes = {name: code for code, name in enumerate(status_names)}
+    interned_fields = frozenset(("Type", "Correct"))
+    __slots__ = fields[:-1] + ("status_code",)
+
+    def __init__(self, values=()):
+# values is a mapping or an iterable of (field, value) pairs, just like for dict(); this is the bulk path used
+# for reading files, so values are taken as they are (QuestionHandler.read_record_from_file interns them)
+        if hasattr(values, "items"):
+            values = values.items()
+        try:
+            for key, value in values:
+                setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    @property
+    def Status(self):
+        return self.status_names[self.status_code]
+
+    @Status.setter
+    def Status(self, status):
+        self.status_code = self.status_codes[status]
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in self.fields:
+            raise KeyError(key)
+        if key in self.interned_fields:
+            value = sys.intern(value)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.fields and hasattr(self, key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __repr__(self):
+        return f"QuestionRecord({dict(self.items())})"
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return [key for key in self.fields if hasattr(self, key)]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def copy(self):
+        return QuestionRecord(self)
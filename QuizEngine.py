@@ -0,0 +1,135 @@
+from MixedTestSampler import MixedTestSampler, write_counter_deltas
+import constants as c
+
+"""QuizEngine
+The practise and test logic without any input() or print(), so it can be driven by the terminal windows, a server
+or a script. Any number of sessions can share one QuestionHandler (one loaded question bank):
+    session = engine.start_session(user_name, c.QUIZ_MODE_TEST, 10)
+    while (question := engine.next_question(session)) != None:
+        correct, correct_answer = engine.submit_answer(session, answer)
+    score, cnt = engine.finish_session(session)
+- practise: questions are drawn by weight (see QuestionHandler.get_random_weighted_record_id) until the session is
+  finished; finishing saves the changed counters unless save_practise is False (the caller saves, e.g. QuizServer)
+- test: a sample of question_count different enabled questions; finishing stores the result in the results store
+- mixed test (start_mixed_session): like a test, but the questions are sampled from the files of all topics by
+  MixedTestSampler; answers to questions of the loaded topic are counted as usual, the others are collected per topic
+  and appended to the journals of their topics when the session is finished
+Questions are handed out as dicts: id, number, text, type ("f" or "m"), choices (A-D, only for multiple choice) and
+topic.
+"""
+
+class QuizSession:
+    def __init__(self, user_name, mode, topic, question_count):
+        self.user_name = user_name
+        self.mode = mode
+        self.topic = topic
+        self.question_count = question_count
+        self.remaining_keys = []
+        self.current_record_id = None
+# mixed test only: the sampled questions, the one asked right now and topic -> {record ID: [Asked, Answered]}
+        self.remaining_records = []
+        self.current_record = None
+        self.counter_deltas = {}
+        self.cnt = 0
+        self.score = 0
+        self.finished = False
+
+class QuizEngine:
+    def __init__(self, questions, results, save_practise = True):
+        self.questions = questions
+        self.results = results
+        self.save_practise = save_practise
+
+    def start_session(self,user_name,mode,question_count = 0):
+# question_count is only used in test mode and has to be between 1 and the number of enabled questions
+        session = QuizSession(user_name, mode, self.questions.data_file_name, question_count)
+        if mode == c.QUIZ_MODE_TEST:
+            if not 1 <= question_count <= self.questions.enabled_rows:
+                raise ValueError(f"The number of test questions has to be between 1 and {self.questions.enabled_rows}.")
+            session.remaining_keys = self.questions.get_random_key_sample(question_count)
+        return session
+
+    def start_mixed_session(self,user_name,question_count,topic_names,enabled_counts = None):
+# enabled_counts (topic name -> number of enabled questions) splits the test evenly between the topics, without it
+# every enabled question of all topics has the same chance
+        session = QuizSession(user_name, c.QUIZ_MODE_MIXED, c.MIXED_TEST_TOPIC, question_count)
+        session.remaining_records = MixedTestSampler(topic_names).sample(question_count, enabled_counts)
+        session.question_count = len(session.remaining_records)
+        if session.question_count == 0:
+            raise ValueError("There are no enabled questions.")
+        return session
+
+    def next_question(self,session):
+# returns the next question or None when there are no questions left
+        if session.finished:
+            return None
+        if session.mode == c.QUIZ_MODE_MIXED:
+            if len(session.remaining_records) == 0:
+                return None
+            session.current_record = session.remaining_records.pop()
+            session.current_record_id = int(session.current_record["ID"])
+            return self.make_question(session.current_record_id, session.current_record, session.cnt + 1)
+        if session.mode == c.QUIZ_MODE_TEST:
+            if len(session.remaining_keys) == 0:
+                return None
+            session.current_record_id = session.remaining_keys.pop()
+        else:
+            session.current_record_id = self.questions.get_random_weighted_record_id()
+            if session.current_record_id == None:
+                return None
+        return self.get_question(session.current_record_id, session.cnt + 1)
+
+    def get_question(self,record_id,number):
+        return self.make_question(record_id, self.questions.data[record_id], number)
+
+    def make_question(self,record_id,record,number):
+        question = {"id": record_id, "number": number, "text": record["Question"], "type": record["Type"], "choices": {},
+                    "topic": record.get("Topic", self.questions.data_file_name)}
+        if record["Type"] == "m":
+            question["choices"] = {letter: record[f"Answer_{letter}"] for letter in "ABCD"}
+        return question
+
+    def submit_answer(self,session,answer):
+# checks the answer to the current question and returns (answer is correct, correct answer)
+        if session.current_record_id == None:
+            raise ValueError("There is no question to answer.")
+        record_id = session.current_record_id
+        session.current_record_id = None
+        if session.mode == c.QUIZ_MODE_MIXED:
+            correct_answer = session.current_record["Correct"]
+            correct = answer.strip().lower() == correct_answer.lower()
+            self.record_mixed_answer(session,record_id,correct)
+        else:
+            correct_answer = self.questions.data[record_id]["Correct"]
+            correct = answer.strip().lower() == correct_answer.lower()
+            self.questions.record_answer(record_id,correct)
+        session.cnt += 1
+        if correct:
+            session.score += 1
+        return correct, correct_answer
+
+    def finish_session(self,session):
+# saves what the session changed and returns (score, number of answered questions)
+        if session.finished:
+            return session.score, session.cnt
+        session.finished = True
+        if session.mode == c.QUIZ_MODE_MIXED:
+            for topic_name, deltas in session.counter_deltas.items():
+                write_counter_deltas(topic_name,deltas)
+        if session.mode in (c.QUIZ_MODE_TEST, c.QUIZ_MODE_MIXED):
+            if session.cnt > 0:
+                self.results.add_result(session.topic,session.user_name,session.score,session.cnt)
+        elif self.save_practise:
+            self.questions.save_file(session.user_name,True)
+        return session.score, session.cnt
+
+    def record_mixed_answer(self,session,record_id,correct):
+# the loaded topic counts the answer itself (and writes it with its counter buffer)
+        topic_name = session.current_record["Topic"]
+        if topic_name == self.questions.data_file_name and record_id in self.questions.data:
+            self.questions.record_answer(record_id,correct)
+            return
+        deltas = self.questions.correct_answer_deltas if correct else self.questions.wrong_answer_deltas
+        record_deltas = session.counter_deltas.setdefault(topic_name, {}).setdefault(record_id, [0] * len(deltas))
+        for idx, delta in enumerate(deltas):
+            record_deltas[idx] += delta
@@ -0,0 +1,212 @@
+import asyncio
+import signal
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import json
+from UserHandler import UserHandler
+from QuestionBankLoader import load_questions
+from ResultsHandler import ResultsHandler
+from QuizEngine import QuizEngine
+from TopicCatalog import get_topic_names
+import constants as c
+
+"""QuizServer
+Serves practise and test sessions to many learners from one process (python qtest.py --serve).
+- every topic is loaded once, when it is used the first time, and shared by all sessions (one QuizEngine per topic)
+- test results are collected in memory and written every c.SERVER_FLUSH_INTERVAL seconds and when the server
+  stops, instead of once per session; the changed counters are written by the counter buffer of each topic
+- everything runs in the asyncio event loop thread except listing and loading topics (in a worker thread) and writing results
+  and topics (in the writer thread, one write at a time), which wait for file locks, fsync and may compact a topic
+- a topic is used by one command at a time (topic_locks); while it is being saved, the commands of its learners wait
+  without holding up the learners of other topics
+
+Line based protocol over TCP (UTF-8). Every command gets one answer line "OK <payload>" or "ERR <message>":
+    LOGIN <user name>          OK {"user": ..., "role": ...}
+    TOPICS                     OK ["Geography", ...]
+    PRACTISE <topic>           OK {"topic": ..., "mode": "practise"}
+    TEST <count> <topic>       OK {"topic": ..., "mode": "test", "count": ...}
+    NEXT                       OK {"id": ..., "number": ..., "text": ..., "type": ..., "choices": {...}} or OK null
+    ANSWER <answer>            OK {"correct": true/false, "correct_answer": ...}
+    FINISH                     OK {"score": ..., "cnt": ...}
+    QUIT                       OK "Bye" and the connection is closed
+"""
+
+class ResultsBuffer:
+# collects results for ResultsHandler.add_results; used by the engines instead of the ResultsHandler itself
+    def __init__(self):
+        self.results = []
+
+    def add_result(self,topic,user_name,correct,total):
+        self.results.append((datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), topic, user_name, correct, total))
+
+    def take_results(self):
+        results, self.results = self.results, []
+        return results
+
+class QuizServer:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.users = UserHandler(c.USER_CSVFILE_NAME,10,70)
+        self.results = ResultsHandler()
+        self.results_buffer = ResultsBuffer()
+        self.engines = {}
+        self.topic_locks = {}
+        self.writer = ThreadPoolExecutor(1)
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.writer.shutdown()
+            self.flush()
+            self.results.close()
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        print(f"{c.COLOR_HEADER}QTest server listening on {self.host}:{self.port}{c.COLOR_NORMAL}")
+        flush_task = asyncio.create_task(self.flush_periodically())
+# stop cleanly on Ctrl+C and kill, so that run() can flush; Windows has no signal handlers in asyncio and raises
+# KeyboardInterrupt instead
+        stop_event = asyncio.Event()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal_number, stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        try:
+            async with server:
+                await stop_event.wait()
+        finally:
+            flush_task.cancel()
+
+    async def flush_periodically(self):
+        while True:
+            await asyncio.sleep(c.SERVER_FLUSH_INTERVAL)
+            await self.flush_in_writer()
+
+    async def flush_in_writer(self):
+# like flush, but the writing is done in the writer thread while the event loop goes on
+        loop = asyncio.get_running_loop()
+        results = self.results_buffer.take_results()
+        if len(results) > 0:
+            await loop.run_in_executor(self.writer, self.results.add_results, results)
+        for topic, engine in list(self.engines.items()):
+            async with self.topic_locks[topic]:
+                if self.needs_saving(engine):
+                    await loop.run_in_executor(self.writer, engine.questions.save_file, c.SERVER_USER_NAME, True)
+
+    def flush(self):
+# one transaction for all results and one journal append per topic with waiting counters; only used when the event
+# loop has stopped
+        results = self.results_buffer.take_results()
+        if len(results) > 0:
+            self.results.add_results(results)
+        for engine in self.engines.values():
+            if self.needs_saving(engine):
+                engine.questions.save_file(c.SERVER_USER_NAME,True)
+
+    def needs_saving(self,engine):
+        return engine.questions.save_flag or engine.questions.counter_buffer.has_pending()
+
+    async def get_engine(self,topic):
+        if topic not in self.engines:
+            loop = asyncio.get_running_loop()
+            if topic not in await loop.run_in_executor(None, get_topic_names):
+                raise ValueError(f"There is no topic {topic}.")
+            lock = self.topic_locks.setdefault(topic, asyncio.Lock())
+            async with lock:
+                if topic not in self.engines:
+                    questions = await loop.run_in_executor(None, load_questions, topic, 10, 130)
+# a topic with records which cannot be read is not served: saving it would drop these records from the file
+                    if len(questions.read_errors) > 0:
+                        await loop.run_in_executor(None, questions.counter_buffer.stop)
+                        raise ValueError(f"Topic {topic} has rows which cannot be read ({len(questions.read_errors)}), please check the file.")
+                    questions.read_errors = None
+                    self.engines[topic] = QuizEngine(questions, self.results_buffer, False)
+        return self.engines[topic]
+
+    async def handle_client(self,reader,writer):
+        client = {"user": None, "engine": None, "session": None}
+        writer.write(b'OK "QTest server"\n')
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command, _, argument = line.decode("utf-8").strip().partition(" ")
+                try:
+                    payload = await self.handle_command(client,command.upper(),argument.strip())
+                    writer.write(f"OK {json.dumps(payload)}\n".encode("utf-8"))
+                except ValueError as e:
+                    writer.write(f"ERR {e}\n".encode("utf-8"))
+                await writer.drain()
+                if command.upper() == "QUIT":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            await self.finish_session(client)
+            writer.close()
+
+    async def handle_command(self,client,command,argument):
+        if command == "QUIT":
+            return "Bye"
+        if command == "LOGIN":
+            record_id, record = self.users.fetch_record_by_key("Name",argument)
+            if record == None:
+                raise ValueError("Login failed.")
+            client["user"] = record["Name"]
+            return {"user": record["Name"], "role": record["Type"]}
+        if client["user"] == None:
+            raise ValueError("Please log in first.")
+        match command:
+            case "TOPICS":
+                return await asyncio.get_running_loop().run_in_executor(None, get_topic_names)
+            case "PRACTISE":
+                return await self.start_session(client,argument,c.QUIZ_MODE_PRACTISE,0)
+            case "TEST":
+                count, _, topic = argument.partition(" ")
+                try:
+                    count = int(count)
+                except ValueError:
+                    raise ValueError("Usage: TEST <count> <topic>")
+                return await self.start_session(client,topic,c.QUIZ_MODE_TEST,count)
+            case "NEXT":
+                session = self.get_session(client)
+                async with self.topic_locks[session.topic]:
+                    return client["engine"].next_question(session)
+            case "ANSWER":
+                session = self.get_session(client)
+                async with self.topic_locks[session.topic]:
+                    correct, correct_answer = client["engine"].submit_answer(session,argument)
+                return {"correct": correct, "correct_answer": correct_answer}
+            case "FINISH":
+                self.get_session(client)
+                score, cnt = await self.finish_session(client)
+                return {"score": score, "cnt": cnt}
+        raise ValueError(f"Unknown command {command}.")
+
+    async def start_session(self,client,topic,mode,count):
+        await self.finish_session(client)
+        engine = await self.get_engine(topic)
+        async with self.topic_locks[topic]:
+            client["session"] = engine.start_session(client["user"],mode,count)
+        client["engine"] = engine
+        return {"topic": topic, "mode": mode, "count": count} if mode == c.QUIZ_MODE_TEST else {"topic": topic, "mode": mode}
+
+    def get_session(self,client):
+        if client["session"] == None:
+            raise ValueError("Please start a session first.")
+        return client["session"]
+
+    async def finish_session(self,client):
+        if client["session"] == None:
+            return 0, 0
+        async with self.topic_locks[client["session"].topic]:
+            score, cnt = client["engine"].finish_session(client["session"])
+        client["session"] = None
+        client["engine"] = None
+        return score, cnt
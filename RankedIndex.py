@@ -0,0 +1,117 @@
+from bisect import bisect_left, bisect_right, insort
+
+"""RankedIndex
+A sorted collection of keys which supports adding and removing keys, asking for the rank (position) of a key and
+cutting out a page of keys without sorting everything again.
+The keys are stored in a list of sorted buckets (each at most 2 * bucket_size long):
+- add/remove: binary search for the bucket, then insert into/delete from that small bucket
+- rank: binary search for the bucket + number of keys in the buckets before it
+- page: find the bucket of the first row, then walk on until the page is full
+The keys have to be unique and comparable, e.g. tuples ending with the record ID.
+Like WeightedSampler, it can collect keys unsorted during bulk loads (invalidate) and sorts them once when needed.
+"""
+
+class RankedIndex:
+    bucket_size = 1000
+
+    def __init__(self, keys=()):
+        self.rebuild(keys)
+
+    def rebuild(self, keys):
+        keys = sorted(keys)
+        self.buckets = [keys[idx:idx + self.bucket_size] for idx in range(0, len(keys), self.bucket_size)]
+        self.maxes = [bucket[-1] for bucket in self.buckets]
+        self.length = len(keys)
+        self.offsets = None
+        self.pending = None
+
+    def invalidate(self):
+# used for bulk loads: keys are only collected and sorted on the next query
+        if self.pending == None:
+            self.pending = list(self)
+
+    def __len__(self):
+        return len(self.pending) if self.pending != None else self.length
+
+    def __iter__(self):
+        if self.pending != None:
+            self.rebuild(self.pending)
+        for bucket in self.buckets:
+            yield from bucket
+
+    def add(self, key):
+        if self.pending != None:
+            self.pending.append(key)
+            return
+        self.offsets = None
+        self.length += 1
+        if len(self.buckets) == 0:
+            self.buckets.append([key])
+            self.maxes.append(key)
+            return
+        bucket_idx = bisect_left(self.maxes, key)
+        if bucket_idx == len(self.maxes):
+            bucket_idx -= 1
+            self.buckets[bucket_idx].append(key)
+            self.maxes[bucket_idx] = key
+        else:
+            insort(self.buckets[bucket_idx], key)
+        bucket = self.buckets[bucket_idx]
+        if len(bucket) > 2 * self.bucket_size:
+            self.buckets[bucket_idx:bucket_idx + 1] = [bucket[:self.bucket_size], bucket[self.bucket_size:]]
+            self.maxes[bucket_idx:bucket_idx + 1] = [bucket[self.bucket_size - 1], bucket[-1]]
+
+    def remove(self, key):
+        if self.pending != None:
+            self.rebuild(self.pending)
+        bucket_idx = bisect_left(self.maxes, key)
+        if bucket_idx == len(self.maxes):
+            raise KeyError(key)
+        bucket = self.buckets[bucket_idx]
+        idx = bisect_left(bucket, key)
+        if bucket[idx] != key:
+            raise KeyError(key)
+        del bucket[idx]
+        self.length -= 1
+        self.offsets = None
+        if len(bucket) == 0:
+            del self.buckets[bucket_idx]
+            del self.maxes[bucket_idx]
+        else:
+            self.maxes[bucket_idx] = bucket[-1]
+
+    def rank(self, key):
+# returns the 0-based position of key or -1 if it is not in the index
+        if self.pending != None:
+            self.rebuild(self.pending)
+        bucket_idx = bisect_left(self.maxes, key)
+        if bucket_idx == len(self.maxes):
+            return -1
+        bucket = self.buckets[bucket_idx]
+        idx = bisect_left(bucket, key)
+        if bucket[idx] != key:
+            return -1
+        return self.get_offsets()[bucket_idx] + idx
+
+    def page(self, start_row, end_row):
+# returns the keys at positions start_row..end_row-1
+        if self.pending != None:
+            self.rebuild(self.pending)
+        offsets = self.get_offsets()
+        result = []
+        bucket_idx = bisect_right(offsets, start_row) - 1
+        idx = start_row - offsets[bucket_idx] if bucket_idx >= 0 else 0
+        while bucket_idx < len(self.buckets) and len(result) < end_row - start_row:
+            bucket = self.buckets[bucket_idx]
+            result.extend(bucket[idx:idx + end_row - start_row - len(result)])
+            bucket_idx += 1
+            idx = 0
+        return result
+
+    def get_offsets(self):
+# offsets[i] is the number of keys in the buckets before bucket i; recalculated only after a change
+        if self.offsets == None:
+            self.offsets = [0]
+            for bucket in self.buckets[:-1]:
+                self.offsets.append(self.offsets[-1] + len(bucket))
+        return self.offsets
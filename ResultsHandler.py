@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import datetime
+import constants as c
+
+"""ResultsHandler
+Stores the test results in an sqlite database in the Data folder instead of appending lines to results.txt.
+The results table has indexes on (user, time stamp) and (topic, time stamp), so asking for the last results of a
+user or a topic only reads the rows returned.
+The old results.txt is imported once when the database is created (import_results_file); the settings table
+remembers that it was done.
+"""
+
+class ResultsHandler:
+    def __init__(self):
+# the QuizServer writes the results from its writer thread
+        self.connection = sqlite3.connect(self.db_file_path, timeout=c.RESULTS_DB_TIMEOUT, check_same_thread=False)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY,
+                time_stamp TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                user TEXT NOT NULL,
+                correct INTEGER NOT NULL,
+                total INTEGER NOT NULL);
+            CREATE INDEX IF NOT EXISTS results_by_user ON results (user, time_stamp);
+            CREATE INDEX IF NOT EXISTS results_by_topic ON results (topic, time_stamp);
+            CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.import_results_file()
+
+    @property
+    def db_file_path(self):
+        return f"{c.DATA_FOLDER}/{c.RESULTS_DB_FILENAME}"
+
+    def add_result(self,topic,user_name,correct,total):
+        time_stamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.add_results([(time_stamp,topic,user_name,correct,total)])
+
+    def add_results(self,results):
+# results: list of (time stamp, topic, user name, correct, total); written in one transaction
+        with self.connection:
+            self.connection.executemany("INSERT INTO results (time_stamp, topic, user, correct, total) VALUES (?, ?, ?, ?, ?)", results)
+
+    def fetch_results(self,user_name = None,topic = None,limit = c.RESULTS_HISTORY_ROWS):
+# newest results first as list of (time stamp, topic, user name, correct, total)
+        conditions = []
+        parameters = []
+        if user_name != None:
+            conditions.append("user = ?")
+            parameters.append(user_name)
+        if topic != None:
+            conditions.append("topic = ?")
+            parameters.append(topic)
+        where = f"WHERE {' AND '.join(conditions)}" if len(conditions) > 0 else ""
+        return self.connection.execute(f"SELECT time_stamp, topic, user, correct, total FROM results {where} ORDER BY time_stamp DESC, id DESC LIMIT ?", parameters + [limit]).fetchall()
+
+    def fetch_user_averages(self):
+# per user: (user name, number of tests, correct answers, answered questions, average score of the tests in %)
+        return self.connection.execute("SELECT user, COUNT(*), SUM(correct), SUM(total), AVG(100.0 * correct / total) FROM results WHERE total > 0 GROUP BY user ORDER BY user").fetchall()
+
+    def import_results_file(self):
+# results.txt lines look like: "2023-05-15 01:02:57 test bed                       Katya          3     6 50.0 %"
+# The topic may contain spaces, so the line is split from the right.
+        if self.connection.execute("SELECT value FROM settings WHERE name = 'results_file_imported'").fetchone() != None:
+            return
+        results = []
+        if os.path.exists(c.RESULTS_FILENAME):
+            with open(c.RESULTS_FILENAME, "r") as result_file:
+                for line in result_file:
+                    fields = line.split()
+                    try:
+                        results.append((f"{fields[0]} {fields[1]}", " ".join(fields[2:-5]), fields[-5], int(fields[-4]), int(fields[-3])))
+                    except (IndexError, ValueError):
+                        continue
+# another process may be importing at the same time; then the settings row exists and this import is rolled back
+        try:
+            with self.connection:
+                self.connection.executemany("INSERT INTO results (time_stamp, topic, user, correct, total) VALUES (?, ?, ?, ?, ?)", results)
+                self.connection.execute("INSERT INTO settings (name, value) VALUES ('results_file_imported', ?)", (str(len(results)),))
+        except sqlite3.IntegrityError:
+            pass
+
+    def close(self):
+        self.connection.close()
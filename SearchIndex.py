@@ -0,0 +1,62 @@
+import math
+from array import array
+from collections import Counter
+from helper_functions import normalize_text
+
+"""SearchIndex
+Inverted index for the full-text search of the data windows ("/" key): for every word (normalized with
+normalize_text, so case and punctuation do not matter) it holds the records containing it.
+    index = SearchIndex(("Question", "Answer_A"))
+    index.add(record_id, record)                  # for every record, again after it was changed (update)
+    index.search("capital france", data)          # IDs of the records with all the words, best match first
+The postings of a word are an array of record ID * 256 + number of times the word is in the record (at most 255),
+which is much smaller than a set per word. Matches are ranked by TF-IDF: words which are in fewer records count
+more, and so do words which are in a record more often.
+A changed record is added again without removing its old postings, but it is remembered in changed_ids and checked
+against its current text when it is found, so old words do not find it anymore.
+"""
+
+class SearchIndex:
+    def __init__(self, fields):
+        self.fields = fields
+        self.postings = {}
+        self.changed_ids = set()
+
+    def get_word_counts(self, record):
+        return Counter(normalize_text(" ".join([str(record[field]) for field in self.fields])).split())
+
+    def add(self, record_id, record):
+        for word, count in self.get_word_counts(record).items():
+            posting = self.postings.get(word)
+            if posting == None:
+                posting = self.postings[word] = array("q")
+            posting.append(record_id * 256 + min(count, 255))
+
+    def update(self, record_id, record):
+        self.changed_ids.add(record_id)
+        self.add(record_id, record)
+
+    def search(self, query, data):
+# returns the IDs of the records in data which contain all words of query, best match first
+        words = list(dict.fromkeys(normalize_text(query).split()))
+        postings = [self.postings.get(word) for word in words]
+        if len(words) == 0 or None in postings:
+            return []
+        scores = None
+# starting with the rarest word keeps the set of candidates small
+        for word, posting in sorted(zip(words, postings), key=lambda item: len(item[1])):
+            idf = math.log(1 + len(data) / len(posting))
+            word_scores = {}
+            for entry in posting:
+                record_id = entry >> 8
+                if scores == None or record_id in scores:
+                    word_scores[record_id] = (1 + math.log(entry & 255)) * idf
+            scores = {record_id: score + (0 if scores == None else scores[record_id]) for record_id, score in word_scores.items()}
+        for record_id in self.changed_ids & scores.keys():
+            record = data.get(record_id)
+            word_counts = {} if record == None else self.get_word_counts(record)
+            if all(word in word_counts for word in words):
+                scores[record_id] = sum((1 + math.log(min(word_counts[word], 255))) * math.log(1 + len(data) / len(posting)) for word, posting in zip(words, postings))
+            else:
+                del scores[record_id]
+        return [record_id for record_id in sorted(scores, key=lambda record_id: (-scores[record_id], record_id)) if record_id in data]
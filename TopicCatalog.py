@@ -0,0 +1,200 @@
+import os
+import csv
+import heapq
+import json
+from concurrent.futures import ProcessPoolExecutor
+from FileLock import FileLock
+from Instrumentation import instruments
+import constants as c
+
+"""TopicCatalog
+Keeps a summary of every topic file in the Data folder so that the topics screen does not have to load topics:
+- number of questions, number of enabled questions
+- last updated time stamp and user (from the settings row of the csv file or the last save in the journal)
+- total of asked and answered questions (the aggregate score)
+- the hardest questions: the c.HARDEST_QUESTIONS_COUNT questions with the lowest success rate of those asked at
+  least c.HARDEST_MIN_ASKED times, as (ID, question text, asked, answered)
+The summaries are cached (as JSON) in the .cache folder together with the modification time and size of the csv file and
+its journal. refresh only scans the files which changed since their summary was made; if several files changed,
+they are scanned in parallel by a pool of worker processes. Other csv files in the Data folder (e.g. the source of
+an import) have no ID, Flag, Asked, Answered or Question column; they are not topics and get_topic_names leaves them out.
+scan_topic_file reads a topic file row by row and never builds the records, so it is cheap on memory as well.
+get_last_topic/set_last_topic remember the topic chosen last, which is loaded at the next start.
+"""
+
+# the columns read by scan_topic_file; ID, Flag, Asked and Answered in this order first
+TOPIC_FIELDS = ("ID", "Flag", "Asked", "Answered", "Question")
+
+class TopicCatalog:
+    def __init__(self):
+        self.topics = {}
+        self.read_cache()
+
+    @property
+    def cache_file_path(self):
+        return f"{c.DATA_FOLDER}/{c.CACHE_FOLDER_NAME}/{c.TOPIC_CATALOG_FILENAME}"
+
+    @instruments.timed
+    def refresh(self):
+# brings the catalog up to date and returns the sorted list of topic names
+        topic_names = get_topic_names()
+        changed_topics = [topic_name for topic_name in topic_names
+                          if topic_name not in self.topics or self.topics[topic_name]["stamp"] != get_topic_stamp(topic_name)]
+        changed = len(changed_topics) > 0
+        if len(changed_topics) > 1:
+            with ProcessPoolExecutor(min(len(changed_topics), os.cpu_count() or 1)) as executor:
+                scanned_topics = list(executor.map(scan_topic_file, changed_topics))
+        else:
+            scanned_topics = [scan_topic_file(topic_name) for topic_name in changed_topics]
+        for topic in scanned_topics:
+            self.topics[topic["name"]] = topic
+        for topic_name in list(self.topics):
+            if topic_name not in topic_names:
+                del self.topics[topic_name]
+                changed = True
+        if changed:
+            self.write_cache()
+        return topic_names
+
+    def read_cache(self):
+        try:
+            with open(self.cache_file_path, "r", encoding="utf-8") as cache_file:
+                cache = json.load(cache_file)
+            if cache["version"] == c.CACHE_VERSION:
+# JSON has no tuples; the stamps are compared with get_topic_stamp
+                for topic in cache["topics"].values():
+                    topic["stamp"] = tuple(topic["stamp"])
+                    topic["hardest"] = [tuple(question) for question in topic["hardest"]]
+                self.topics = cache["topics"]
+        except Exception:
+            self.topics = {}
+
+    def write_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file_path), exist_ok=True)
+            with open(f"{self.cache_file_path}.tmp", "w", encoding="utf-8") as cache_file:
+                json.dump({"version": c.CACHE_VERSION, "topics": self.topics}, cache_file, ensure_ascii=False)
+            os.replace(f"{self.cache_file_path}.tmp", self.cache_file_path)
+        except (OSError, TypeError, ValueError):
+            pass
+
+def get_topic_names():
+    return sorted(file_name[:-4] for file_name in os.listdir(c.DATA_FOLDER)
+                  if file_name.endswith(".csv") and file_name != f"{c.USER_CSVFILE_NAME}.csv" and is_topic_file(file_name[:-4]))
+
+def get_last_topic():
+# the topic chosen last (on this computer) if it still exists, otherwise the default topic
+    try:
+        with open(f"{c.DATA_FOLDER}/{c.CACHE_FOLDER_NAME}/{c.LAST_TOPIC_FILENAME}", "r") as last_topic_file:
+            topic_name = last_topic_file.read().strip()
+        if os.path.exists(f"{c.DATA_FOLDER}/{topic_name}.csv") and topic_name != c.USER_CSVFILE_NAME:
+            return topic_name
+    except OSError:
+        pass
+    return c.DEFAULT_TEST_CSVFILE
+
+def set_last_topic(topic_name):
+    try:
+        os.makedirs(f"{c.DATA_FOLDER}/{c.CACHE_FOLDER_NAME}", exist_ok=True)
+        with open(f"{c.DATA_FOLDER}/{c.CACHE_FOLDER_NAME}/{c.LAST_TOPIC_FILENAME}", "w") as last_topic_file:
+            last_topic_file.write(topic_name)
+    except OSError:
+        pass
+
+def get_topic_stamp(topic_name):
+# modification time and size of csv file and journal; (0, 0) for a missing journal
+    stamp = []
+    for file_path in [f"{c.DATA_FOLDER}/{topic_name}.csv", f"{c.DATA_FOLDER}/{topic_name}.journal"]:
+        try:
+            file_stat = os.stat(file_path)
+            stamp += [file_stat.st_mtime_ns, file_stat.st_size]
+        except OSError:
+            stamp += [0, 0]
+    return tuple(stamp)
+
+def is_topic_file(topic_name):
+# only reads the header row, without the file lock, so no lock file is left next to a csv file which is no topic
+    try:
+        with open(f"{c.DATA_FOLDER}/{topic_name}.csv", "r", newline="") as csvfile:
+            headers = next(csv.reader(csvfile,delimiter=c.CSV_FILE_DELIMITER), [])
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return False
+    return all(field in headers for field in TOPIC_FIELDS)
+
+def scan_topic_file(topic_name):
+# summary of a topic file and its journal; the questions are kept only as (Flag, Asked, Answered)
+    topic = {"name": topic_name, "questions": 0, "enabled": 0, "asked": 0, "answered": 0,
+             "time_stamp": "never", "user": "no one"}
+    counters = {}
+    with FileLock(f"{c.DATA_FOLDER}/{topic_name}.lock"):
+        topic["stamp"] = get_topic_stamp(topic_name)
+        with open(f"{c.DATA_FOLDER}/{topic_name}.csv", "r", newline="") as csvfile:
+            reader = csv.reader(csvfile,delimiter=c.CSV_FILE_DELIMITER)
+            headers = next(reader, [])
+            columns = [headers.index(field) for field in TOPIC_FIELDS[:4]]
+            settings = next(reader, [])
+            if len(settings) >= 3:
+                topic["time_stamp"], topic["user"] = settings[1], settings[2]
+            for row in reader:
+                read_topic_row(counters,row,columns)
+        try:
+            with open(f"{c.DATA_FOLDER}/{topic_name}.journal", "r", newline="") as journal_file:
+                for row in csv.reader(journal_file,delimiter=c.CSV_FILE_DELIMITER):
+                    if len(row) < 2:
+                        continue
+                    if row[0] == c.JOURNAL_OP_UPDATE and len(row) == len(headers) + 1:
+                        old_counters = counters.get(to_int(row[1]))
+                        read_topic_row(counters,row[1:],columns)
+                        if old_counters != None:
+                            counters[to_int(row[1])][1:] = old_counters[1:]
+                    elif row[0] == c.JOURNAL_OP_COUNTERS and to_int(row[1]) in counters and len(row) == 4:
+                        counters[to_int(row[1])][1] += to_int(row[2])
+                        counters[to_int(row[1])][2] += to_int(row[3])
+                    elif row[0] == c.JOURNAL_OP_DELETE:
+                        counters.pop(to_int(row[1]), None)
+                    elif row[0] == c.JOURNAL_OP_META and len(row) >= 4:
+                        topic["time_stamp"], topic["user"] = row[2], row[3]
+        except FileNotFoundError:
+            pass
+        hardest_ids = heapq.nsmallest(c.HARDEST_QUESTIONS_COUNT, (record_id for record_id, (flag, asked, answered) in counters.items() if asked >= c.HARDEST_MIN_ASKED),
+                                      key=lambda record_id: (counters[record_id][2] / counters[record_id][1], -counters[record_id][1], record_id))
+        texts = read_question_texts(topic_name, headers, set(hardest_ids))
+        topic["hardest"] = [(record_id, texts.get(record_id, ""), counters[record_id][1], counters[record_id][2]) for record_id in hardest_ids]
+    for flag, asked, answered in counters.values():
+        topic["questions"] += 1
+        topic["enabled"] += 1 if flag == c.FLAG_ENABLED else 0
+        topic["asked"] += asked
+        topic["answered"] += answered
+    return topic
+
+def read_question_texts(topic_name,headers,record_ids):
+# record ID -> question text for a few questions (a second pass over csv file and journal); the caller has to hold
+# the file lock
+    texts = {}
+    if len(record_ids) == 0:
+        return texts
+    id_column, text_column = headers.index("ID"), headers.index("Question")
+    with open(f"{c.DATA_FOLDER}/{topic_name}.csv", "r", newline="") as csvfile:
+        for row in csv.reader(csvfile,delimiter=c.CSV_FILE_DELIMITER):
+            if len(row) == len(headers) and to_int(row[id_column]) in record_ids:
+                texts[to_int(row[id_column])] = row[text_column]
+    try:
+        with open(f"{c.DATA_FOLDER}/{topic_name}.journal", "r", newline="") as journal_file:
+            for row in csv.reader(journal_file,delimiter=c.CSV_FILE_DELIMITER):
+                if row[:1] == [c.JOURNAL_OP_UPDATE] and len(row) == len(headers) + 1 and to_int(row[1]) in record_ids:
+                    texts[to_int(row[1])] = row[text_column + 1]
+    except FileNotFoundError:
+        pass
+    return texts
+
+def read_topic_row(counters,row,columns):
+    try:
+        counters[int(row[columns[0]])] = [to_int(row[column]) for column in columns[1:]]
+    except (IndexError, ValueError):
+        pass
+
+def to_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        return 0
@@ -1,7 +1,7 @@
-import os
 import re
 from collections import OrderedDict
 from DataHandler import DataHandler
+from FrameRenderer import screen
 import constants as c
 
 """UserHandler: subclass of DataHandler
@@ -13,6 +13,13 @@ Implements properties and methods prescribed by DataHandler:
 """
 
 class UserHandler(DataHandler):
+    index_fields = {"Name": True, "Type": False}
+    view_definitions = {
+        "A": ("admins", lambda record: record["Type"] == c.USER_TYPE_ADMIN, None),
+        "U": ("users", lambda record: record["Type"] == c.USER_TYPE_USER, None),
+        "N": ("by name", lambda record: True, lambda record_id, record: (record["Name"].casefold(), record_id)),
+    }
+
     def __init__(self, file_name, rows_per_page, window_size):
         super().__init__(file_name, rows_per_page)
         self.window_size = window_size
@@ -39,35 +46,35 @@ class UserHandler(DataHandler):
             self._max_id = 0
 
     def paint_data_window(self,mode):
-        print(f"{c.COLOR_HEADER}Users{c.COLOR_NORMAL} (last updated {self.file_time_stamp} by {self.file_user})")
-        print("┌" + "─" * (self.window_size - 2) + "┐")
-        print("│  ID  User name                    User type    Status".ljust(self.window_size - 8) + f" {self.current_page:2d}/{self.total_pages:2d} │")
-        print("├" + "─" * (self.window_size - 2) + "┤")
+        screen.print(f"{c.COLOR_HEADER}Users{c.COLOR_NORMAL} (last updated {self.file_time_stamp} by {self.file_user})" + (f" - {self.view_title}: {self.page_rows} users" if self.view_keys != None else ""))
+        screen.print("┌" + "─" * (self.window_size - 2) + "┐")
+        screen.print("│  ID  User name                    User type    Status".ljust(self.window_size - 8) + f" {self.current_page:2d}/{self.total_pages:2d} │")
+        screen.print("├" + "─" * (self.window_size - 2) + "┤")
         if self.current_page == 0:
             self.print_empty_rows(self.rows_per_page)
             return
         start_row = (self.current_page - 1) * self.rows_per_page
         end_row = self.current_page * self.rows_per_page
-        if end_row > self.data_rows:
-            end_row = self.data_rows
-        for key, record in list(self.data.items())[start_row:end_row]:
-            print(f"│ {key:3d}. {record['Name'].ljust(29)}{record['Type'].ljust(13)}{record['Status'].ljust(self.window_size - 51)} │")
+        if end_row > self.page_rows:
+            end_row = self.page_rows
+        for key, record in self.get_page_items(start_row,end_row):
+            screen.print(f"│ {key:3d}. {record['Name'].ljust(29)}{record['Type'].ljust(13)}{record['Status'].ljust(self.window_size - 51)} │")
         self.print_empty_rows(self.rows_per_page - (end_row - start_row))
 
     def add_item(self):
         record={}
         while True:
-            record["Name"] = input(f"{c.COLOR_INPUT}User name: {c.COLOR_NORMAL} ")
+            record["Name"] = screen.input(f"{c.COLOR_INPUT}User name: {c.COLOR_NORMAL} ")
             if record["Name"].lower() == "q":
                 return c.WINDOW_USERS + c.EVENT_VIEW_ITEMS
             test_id, test_record = self.fetch_record_by_key("Name", record["Name"])
             if test_record != None:
-                print(f"{c.COLOR_WARNING}This user name already exists.{c.COLOR_NORMAL}")
+                screen.print(f"{c.COLOR_WARNING}This user name already exists.{c.COLOR_NORMAL}")
             elif self.validate_user_name(record["Name"]):
                 break
 
         while True:
-            record["Type"] = input(f"{c.COLOR_INPUT}Set user type - admin or user - a/u:{c.COLOR_NORMAL} ").lower()
+            record["Type"] = screen.input(f"{c.COLOR_INPUT}Set user type - admin or user - a/u:{c.COLOR_NORMAL} ").lower()
             if record["Type"] == "q":
                 return c.WINDOW_USERS + c.EVENT_VIEW_ITEMS
             if record["Type"] in ["a","admin"]:
@@ -77,8 +84,9 @@ class UserHandler(DataHandler):
                 record["Type"] = c.USER_TYPE_USER
                 break
 
-        if input(f"{c.COLOR_INPUT}Do you really want to add user {record['Name']}? (y/n):{c.COLOR_NORMAL} ").lower() == "y":
+        if screen.input(f"{c.COLOR_INPUT}Do you really want to add user {record['Name']}? (y/n):{c.COLOR_NORMAL} ").lower() == "y":
             self.add_record(record)
+            self.set_view(None)
             self.current_page = self.total_pages
         
         return c.WINDOW_USERS + c.EVENT_VIEW_ITEMS
@@ -87,20 +95,24 @@ class UserHandler(DataHandler):
         record_id = self.ask_for_id()
         if record_id == None:
             return c.WINDOW_USERS + c.EVENT_VIEW_ITEMS
-        record = self.data[record_id]
+# a copy is edited, so the record and its Name index stay as they are unless the update is confirmed
+        record = self.data[record_id].copy()
 
         while True:
-            str = input(f"{c.COLOR_INPUT}Enter new user name or press enter to leave it unchanged:{c.COLOR_NORMAL} ")
+            str = screen.input(f"{c.COLOR_INPUT}Enter new user name or press enter to leave it unchanged:{c.COLOR_NORMAL} ")
             if str.lower() == "q":
                 return c.WINDOW_USERS + c.EVENT_VIEW_ITEMS
             if str == "":
                 break
-            if self.validate_user_name(str):
+            test_id, test_record = self.fetch_record_by_key("Name", str)
+            if test_record != None and test_id != record_id:
+                screen.print(f"{c.COLOR_WARNING}This user name already exists.{c.COLOR_NORMAL}")
+            elif self.validate_user_name(str):
                 record["Name"] = str
                 break
 
         while True:
-            str = input(f"{c.COLOR_INPUT}Set user type - admin or user - a/u:{c.COLOR_NORMAL} ").lower()
+            str = screen.input(f"{c.COLOR_INPUT}Set user type - admin or user - a/u:{c.COLOR_NORMAL} ").lower()
             if str == "q":
                 return c.WINDOW_USERS + c.EVENT_VIEW_ITEMS
             if str in ["a","admin"]:
@@ -110,7 +122,7 @@ class UserHandler(DataHandler):
                 record["Type"] = c.USER_TYPE_USER
                 break
 
-        if input(f"{c.COLOR_INPUT}Do you really want to update user {self.data[record_id]['Name']}? (y/n):{c.COLOR_NORMAL} ").lower() == "y":
+        if screen.input(f"{c.COLOR_INPUT}Do you really want to update user {self.data[record_id]['Name']}? (y/n):{c.COLOR_NORMAL} ").lower() == "y":
             self.update_record(record_id,record)
         return c.WINDOW_USERS + c.EVENT_VIEW_ITEMS
       
@@ -146,17 +158,17 @@ class UserHandler(DataHandler):
 
 # Methods        
     def user_login(self):
-        os.system('cls' if os.name == 'nt' else 'clear')
+        screen.clear()
         cnt = 0
-        print(f"{c.COLOR_HEADER}Welcome to our Quizz Machine!{c.COLOR_NORMAL}\n\nPlease log in and train your brain.\n\n")
+        screen.print(f"{c.COLOR_HEADER}Welcome to our Quizz Machine!{c.COLOR_NORMAL}\n\nPlease log in and train your brain.\n\n")
         while cnt < 3:
-            user_name = input(f"{c.COLOR_INPUT}Enter your user name (or q + enter to cancel):{c.COLOR_NORMAL} ")
+            user_name = screen.input(f"{c.COLOR_INPUT}Enter your user name (or q + enter to cancel):{c.COLOR_NORMAL} ")
             if user_name.lower() == "q":
                 break
             record_id, record = self.fetch_record_by_key("Name",user_name)
             if record == None:
                 cnt += 1
-                print(f"{c.COLOR_WARNING}Login failed.{c.COLOR_NORMAL}")
+                screen.print(f"{c.COLOR_WARNING}Login failed.{c.COLOR_NORMAL}")
                 continue
             self.current_user = record["Name"]
             self.current_user_role = record["Type"]
@@ -167,9 +179,9 @@ class UserHandler(DataHandler):
     def validate_user_name(self,user_name):
         pattern = r"\W"
         if re.search(pattern,user_name):
-            print(f"{c.COLOR_WARNING}You can only use letters, numbers and underscore in a user name.{c.COLOR_NORMAL}")
+            screen.print(f"{c.COLOR_WARNING}You can only use letters, numbers and underscore in a user name.{c.COLOR_NORMAL}")
             return False
         if len(user_name) > 10:
-            print(f"{c.COLOR_WARNING}A user name cannot be longer than 10 characters.{c.COLOR_NORMAL}")
+            screen.print(f"{c.COLOR_WARNING}A user name cannot be longer than 10 characters.{c.COLOR_NORMAL}")
             return False
         return True
@@ -0,0 +1,108 @@
+import random
+from array import array
+
+"""WeightedSampler
+Draws random keys with a probability proportional to their weight.
+The weights live in a Fenwick tree (binary indexed tree), so drawing a key and changing the weight of a key
+both take O(log n) instead of rebuilding a list of all weights for every draw.
+- weights are integers so that the running sums stay exact; weights and tree are kept in integer arrays, which
+  take 8 bytes per key instead of a Python int object each
+- every key gets a slot the first time it is seen; removing a key just sets its weight to 0
+- keys added in bulk (e.g. while reading a file) are only collected, the tree is built once in O(n) when it is
+  needed for the first time
+"""
+
+class WeightedSampler:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.keys = []
+        self.weights = array("q")
+        self.slots = {}
+        self.tree = array("q", [0])
+        self.tree_is_valid = True
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.slots
+
+    @property
+    def total_weight(self):
+        return self.prefix_sum(len(self.weights))
+
+    def set_weight(self, key, weight):
+        slot = self.slots.get(key)
+        if slot == None:
+            self.append(key, weight)
+            return
+        delta = weight - self.weights[slot]
+        if delta == 0:
+            return
+        self.weights[slot] = weight
+        if not self.tree_is_valid:
+            return
+        idx = slot + 1
+        while idx < len(self.tree):
+            self.tree[idx] += delta
+            idx += idx & -idx
+
+    def remove(self, key):
+        self.set_weight(key, 0)
+
+    def append(self, key, weight):
+        self.slots[key] = len(self.keys)
+        self.keys.append(key)
+        self.weights.append(weight)
+        if not self.tree_is_valid:
+            return
+# tree[idx] holds the sum of the slots (idx - lowbit(idx), idx], which are all in the tree already
+        idx = len(self.weights)
+        self.tree.append(weight + self.prefix_sum(idx - 1) - self.prefix_sum(idx - (idx & -idx)))
+
+    def draw(self):
+# returns a random key or None if all weights are 0
+        total = self.total_weight
+        if total <= 0:
+            return None
+        target = random.randrange(total)
+        idx = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            next_idx = idx + step
+            if next_idx < len(self.tree) and self.tree[next_idx] <= target:
+                idx = next_idx
+                target -= self.tree[next_idx]
+            step >>= 1
+        return self.keys[idx]
+
+    def prefix_sum(self, slot_count):
+        if not self.tree_is_valid:
+            self.build_tree()
+        total = 0
+        idx = slot_count
+        while idx > 0:
+            total += self.tree[idx]
+            idx -= idx & -idx
+        return total
+
+    def load(self, keys, weights):
+# replaces all keys and weights at once (e.g. with weights computed by ColumnStore); the tree is built when needed
+        self.keys = list(keys)
+        self.weights = array("q", weights)
+        self.slots = dict(zip(self.keys, range(len(self.keys))))
+        self.tree_is_valid = False
+
+    def invalidate(self):
+# used for bulk loads: the tree is rebuilt on the next draw instead of being updated for every key
+        self.tree_is_valid = False
+
+    def build_tree(self):
+        self.tree = array("q", [0]) + self.weights
+        for idx in range(1, len(self.tree)):
+            parent = idx + (idx & -idx)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[idx]
+        self.tree_is_valid = True
@@ -0,0 +1,121 @@
+import os
+import io
+import csv
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import datetime
+import tempfile
+import statistics
+from contextlib import redirect_stdout
+from QuestionHandler import QuestionHandler
+from FrameRenderer import screen
+import constants as c
+
+"""Benchmark
+Measures how the hot paths of DataHandler and QuestionHandler scale with the size of a topic:
+- generates synthetic topic csv files in the usual ;-delimited format in a temporary Data folder
+- times read_file (without and with cache), save_file (journal and full rewrite), get_random_weighted_record_id,
+  get_random_key_sample, get_sorted_key_list and paint_data_window (questions manager and statistics)
+- everything printed by the handlers is suppressed
+- writes the results as json (seconds per call, median of the repeats) so that versions can be compared
+
+Usage: python benchmark.py [--sizes 1000 100000 1000000] [--repeat 5] [--output bench_results.json]
+"""
+
+HEADERS = ["ID","Type","Question","Answer_A","Answer_B","Answer_C","Answer_D","Correct","Flag","Asked","Answered"]
+
+def write_topic_file(file_path,size):
+    random.seed(size)
+    with open(file_path, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile,delimiter=c.CSV_FILE_DELIMITER)
+        writer.writerow(HEADERS)
+        writer.writerow([size, "2023-05-16 21:34:25", "benchmark"] + ["Unused"]*(len(HEADERS)-3))
+        for record_id in range(1, size + 1):
+            asked = random.randint(0, 20)
+            if record_id % 2 == 0:
+                writer.writerow([record_id, "m", f"Synthetic multiple choice question number {record_id}?", "Alpha", "Bravo", "Charlie", "Delta",
+                                 random.choice("ABCD"), int(random.random() > 0.1), asked, random.randint(0, asked)])
+            else:
+                writer.writerow([record_id, "f", f"Synthetic free question number {record_id}?", "", "", "", "",
+                                 f"Answer {record_id}", int(random.random() > 0.1), asked, random.randint(0, asked)])
+
+def measure(function,repeat):
+# median seconds per call
+    timings = []
+    for idx in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def remove_cache(topic_name):
+    cache_file_path = f"{c.DATA_FOLDER}/{c.CACHE_FOLDER_NAME}/{topic_name}.json"
+    if os.path.exists(cache_file_path):
+        os.remove(cache_file_path)
+
+def run_size(size,repeat):
+    topic_name = f"Benchmark {size}"
+    write_topic_file(f"{c.DATA_FOLDER}/{topic_name}.csv",size)
+    results = {}
+    with redirect_stdout(io.StringIO()):
+        results["read_file_csv"] = measure(lambda: (remove_cache(topic_name), QuestionHandler(topic_name,10,130)),repeat)
+        questions = QuestionHandler(topic_name,10,130)
+        results["read_file_cached"] = measure(questions.read_file,repeat)
+
+# a practise session of 20 answers, saved to the journal or (without journal_mode) by rewriting the csv file
+        def answer_and_save(journal_mode):
+            for idx in range(20):
+                questions.record_answer(questions.get_random_weighted_record_id(),idx % 2 == 0)
+            questions.journal_mode = journal_mode
+            questions.save_file("benchmark",True)
+        results["save_file_journal"] = measure(lambda: answer_and_save(True),repeat)
+        results["save_file_full"] = measure(lambda: answer_and_save(False),repeat)
+        questions.journal_mode = True
+
+        results["get_random_weighted_record_id"] = measure(lambda: [questions.get_random_weighted_record_id() for idx in range(1000)],repeat) / 1000
+        results["record_answer"] = measure(lambda: [questions.record_answer(questions.get_random_weighted_record_id(),True) for idx in range(1000)],repeat) / 1000
+        results["get_random_key_sample"] = measure(lambda: questions.get_random_key_sample(20),repeat)
+        results["get_sorted_key_list"] = measure(questions.get_sorted_key_list,repeat)
+        questions.current_page = questions.total_pages // 2
+        results["paint_data_window_qmanager"] = measure(lambda: (questions.paint_data_window(c.WINDOW_QMANAGER), screen.flush()),repeat)
+        results["paint_data_window_stats"] = measure(lambda: (questions.paint_data_window(c.WINDOW_STATS), screen.flush()),repeat)
+# write the waiting counters now, the temporary Data folder is gone at exit
+        questions.counter_buffer.stop()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the QTest data handling hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    report = {
+        "time_stamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "sizes": {},
+    }
+    data_folder = c.DATA_FOLDER
+    c.DATA_FOLDER = tempfile.mkdtemp(prefix="qtest_benchmark_")
+    try:
+        for size in args.sizes:
+            report["sizes"][str(size)] = run_size(size,args.repeat)
+            print(f"{size} questions:")
+            for operation, seconds in report["sizes"][str(size)].items():
+                print(f"  {operation.ljust(32)} {seconds * 1000:12.3f} ms")
+    finally:
+        shutil.rmtree(c.DATA_FOLDER, ignore_errors=True)
+        c.DATA_FOLDER = data_folder
+
+    with open(args.output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@ WINDOW_QMANAGER = 500
 WINDOW_USERS = 600
 WINDOW_TOPICS = 700
 WINDOW_QUIT_PROGRAM = 800
+WINDOW_RESULTS = 1000
+WINDOW_MIXED_TEST = 1100
+WINDOW_GLOBAL_STATS = 1200
 BREAK_OUT_OF_JAIL = 900
 WINDOW_EXTRACTOR = 100
 
@@ -43,13 +46,48 @@ QUESTION_TYPE_FREE = "Free"
 QUESTION_TYPE_MULTIPLE_CHOICE = "Multiple choice"
 EDIT_MODE_NEW = "new"
 EDIT_MODE_EDIT = "edit"
+QUIZ_MODE_PRACTISE = "practise"
+QUIZ_MODE_TEST = "test"
+QUIZ_MODE_MIXED = "mixed"
+JOURNAL_OP_UPDATE = "U"
+JOURNAL_OP_DELETE = "D"
+JOURNAL_OP_META = "M"
+JOURNAL_OP_COUNTERS = "C"
 
 
 # Program defaults
 MINIMUM_NUMBER_OF_ENABLED_ITEMS = 5
 DEFAULT_TEST_CSVFILE = "Test bed"
+MIXED_TEST_TOPIC = "Mixed test"
 USER_CSVFILE_NAME = "users"
 DATA_FOLDER = "Data"
+FILE_LOCK_RETRY_INTERVAL = 0.05
 RESULTS_FILENAME = "Data/results.txt"
+RESULTS_DB_FILENAME = "results.db"
+RESULTS_DB_TIMEOUT = 30
+RESULTS_HISTORY_ROWS = 20
+RESULTS_WINDOW_SIZE = 72
+CACHE_FOLDER_NAME = ".cache"
+CACHE_VERSION = 4
+TOPIC_CATALOG_FILENAME = "topics.json"
+LAST_TOPIC_FILENAME = "last_topic.txt"
+HARDEST_QUESTIONS_COUNT = 5
+HARDEST_MIN_ASKED = 3
+GLOBAL_STATS_WINDOW_SIZE = 100
+TOPIC_CACHE_SIZE = 5
+TOPIC_CACHE_MEMORY = 512 * 1024 * 1024
 CSV_FILE_DELIMITER = ";"
+PRACTISE_WEIGHT_SCALE = 1000
+JOURNAL_COMPACT_THRESHOLD = 1000
+COUNTER_FLUSH_INTERVAL = 5
+COUNTER_FLUSH_THRESHOLD = 100
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+SERVER_FLUSH_INTERVAL = 10
+SERVER_USER_NAME = "server"
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_USER_NAME = "import"
+IMPORT_REJECTS_SUFFIX = ".rejected"
 DEBUG_FLAG = False
+INSTRUMENTATION_ENV_VAR = "QTEST_INSTRUMENT"
+INSTRUMENTATION_FILENAME = "instrumentation.txt"
@@ -1,6 +1,9 @@
 """This a collection of small function used in various parts of the project."""
+import string
 import constants as c
 
+PUNCTUATION_TO_SPACE = str.maketrans(string.punctuation, " " * len(string.punctuation))
+
 def extract_window_id(window_event):
     return (window_event // c.WINDOW_EXTRACTOR) * c.WINDOW_EXTRACTOR
 
@@ -16,4 +19,13 @@ def score_to_str(correct,total):
         return f"{score:.1f} %"
     except ValueError:
         return "0.0 %"
-    
\ No newline at end of file
+    
+
+def normalize_text(text):
+# folds case, punctuation and whitespace: "What's  the Capital?" -> "what s the capital"
+    return " ".join(text.casefold().translate(PUNCTUATION_TO_SPACE).split())
+
+def question_text_key(record):
+# the text two questions are compared by to find duplicates: the question and its answers (in any order)
+    answers = sorted(normalize_text(record[f"Answer_{letter}"]) for letter in "ABCD")
+    return "\n".join([normalize_text(record["Question"])] + answers)
@@ -1,47 +1,84 @@
+import argparse
 from UserHandler import UserHandler
-from QuestionHandler import QuestionHandler
-from windows import display_main_menu,say_goodbye,display_data_window,display_practise_window,get_topic,display_test_window
+from QuestionBankLoader import QuestionBankLoader
+from TopicCatalog import TopicCatalog, get_last_topic
+from ResultsHandler import ResultsHandler
+from QuizEngine import QuizEngine
+from windows import display_main_menu,say_goodbye,display_data_window,display_practise_window,get_topic,display_test_window,display_mixed_test_window,display_results_window,display_global_stats_window
 from helper_functions import extract_window_id
+from Instrumentation import instruments, get_event_name
 import constants as c
 
 """Main function:
+    - (python qtest.py --serve runs the QuizServer instead, python qtest.py --import FILE TOPIC the BulkImporter)
     - has two parts:
-        Startup - load user db, user login, load question db
+        Startup - load user db, start loading the question db (the topic used last) in the background, user login
         Window event loop - assign first window event and then do the event loop until quit
     - designed as a window event loop, 
     - each window event is an action message returned from each method/function and identifies:
         - the next window to be called (anything called c.WINDOW_XXX)
         - the next action to be performed (anything called c.EVENT_XXX)
+    - QTEST_INSTRUMENT=1 python qtest.py (or c.DEBUG_FLAG) times the window events, file operations and sampling and
+      writes the timings to Data/instrumentation.txt at exit (see Instrumentation)
 """
 def main():
     users = UserHandler(c.USER_CSVFILE_NAME,10,70)
+# the questions are read while the user logs in; QuestionBankLoader waits for them when they are used first
+    questions = QuestionBankLoader(get_last_topic(),10,130)
     if users.user_login() == False:
         say_goodbye()
         return
-    questions = QuestionHandler(c.DEFAULT_TEST_CSVFILE,10,130)
+    catalog = TopicCatalog()
+    results = ResultsHandler()
+    engine = QuizEngine(questions,results)
 
     window_event = c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
     while True:
-        match extract_window_id(window_event):
-            case c.WINDOW_TOPICS:
-                window_event = get_topic(questions)
-            case c.WINDOW_MAIN_MENU:
-                window_event = display_main_menu(users.current_user_role,questions.data_rows)
-            case c.WINDOW_USERS:
-                window_event = display_data_window(users,window_event,users.current_user)
-            case c.WINDOW_QMANAGER:
-                window_event = display_data_window(questions,window_event,users.current_user)
-            case c.WINDOW_PRACTISE:
-                window_event = display_practise_window(questions,users.current_user)
-            case c.WINDOW_TEST:
-                window_event = display_test_window(questions,users.current_user)
-            case c.WINDOW_STATS:
-                window_event = display_data_window(questions,window_event,users.current_user)
-            case c.WINDOW_QUIT_PROGRAM:
-                window_event = say_goodbye()
-            case c.BREAK_OUT_OF_JAIL:
-                break
+        if extract_window_id(window_event) == c.BREAK_OUT_OF_JAIL:
+            break
+# with instrumentation switched on (see Instrumentation), every window event is timed without the time spent in input()
+        with instruments.measure(f"dispatch {get_event_name(window_event)}"):
+            match extract_window_id(window_event):
+                case c.WINDOW_TOPICS:
+                    window_event = get_topic(questions,catalog,users.current_user)
+                case c.WINDOW_MAIN_MENU:
+                    window_event = display_main_menu(users.current_user_role,questions)
+                case c.WINDOW_USERS:
+                    window_event = display_data_window(users,window_event,users.current_user)
+                case c.WINDOW_QMANAGER:
+                    window_event = display_data_window(questions,window_event,users.current_user)
+                case c.WINDOW_PRACTISE:
+                    window_event = display_practise_window(engine,users.current_user)
+                case c.WINDOW_TEST:
+                    window_event = display_test_window(engine,users.current_user)
+                case c.WINDOW_MIXED_TEST:
+                    window_event = display_mixed_test_window(engine,catalog,users.current_user)
+                case c.WINDOW_RESULTS:
+                    window_event = display_results_window(results,users.current_user,questions.data_file_name)
+                case c.WINDOW_STATS:
+                    window_event = display_data_window(questions,window_event,users.current_user)
+                case c.WINDOW_GLOBAL_STATS:
+                    window_event = display_global_stats_window(catalog,results)
+                case c.WINDOW_QUIT_PROGRAM:
+                    window_event = say_goodbye()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="QTest quiz machine")
+    parser.add_argument("--serve", action="store_true", help="run as quiz server for many learners (see QuizServer)")
+    parser.add_argument("--host", default=c.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=c.SERVER_PORT)
+    parser.add_argument("--import", dest="import_args", nargs=2, metavar=("FILE", "TOPIC"), help="import questions from a csv or JSONL file into a topic (see BulkImporter)")
+    args = parser.parse_args()
+    if args.serve:
+        from QuizServer import QuizServer
+        QuizServer(args.host,args.port).run()
+    elif args.import_args:
+        from BulkImporter import BulkImporter
+        importer = BulkImporter(*args.import_args)
+        imported, rejected = importer.run()
+        print(f"{c.COLOR_HEADER}{imported} questions imported into {importer.topic_name}.{c.COLOR_NORMAL}")
+        if rejected > 0:
+            print(f"{c.COLOR_WARNING}{rejected} rows rejected, see {importer.rejects_file_path}{c.COLOR_NORMAL}")
+    else:
+        main()
@@ -1,73 +1,85 @@
-import os
 import random
-import datetime
+from FrameRenderer import screen
 import constants as c
 from helper_functions import score_to_str,extract_event_id
+from TopicCatalog import set_last_topic
 
 """Window functions
 These are functions which print various windows without requiring full-scale database management.
-- get_topic: ui to choose topic, hands data_file_name over to questions and makes it read that file into OrderedDict
+- get_topic: ui to choose topic from the topic catalog, makes questions switch to that topic
 - say_goodbye says goodbye
 - display_main_menu - main menu ui and action handling
 - display_data_window - prints the whole screen of data tables with header, data table, shortkey bar
-- display_practise_window - does the whole practise thing, visuals and ui (ugly solution, didn't have time. Sorry!)
-- display_test_window - does the whole test thing, visuals and ui, writes score to results.txt (another ugly solution, 
-  didn't have time. Sorry! Again!)
+- display_practise_window - visuals and ui for practise, the practise logic itself is in QuizEngine
+- display_test_window - visuals and ui for tests, the test logic (including writing the score to the results database)
+  is in QuizEngine
+- display_mixed_test_window - the same for a test with questions of all topics
+- display_results_window - shows the last test results of the user, for all topics or the current one
+- display_global_stats_window - statistics of all topics (from the topic catalog) and the test results of all users
 - print_footer is used in other functions here to print the footer. Yes. :)
+- print_question prints a question handed out by QuizEngine
+All output goes through FrameRenderer.screen: a window starts with screen.clear() and is written when it asks
+for input.
 """
 
-def get_topic(questions):
-    os.system('cls' if os.name == 'nt' else 'clear')
-    print(f"{c.COLOR_HEADER}These are our topics:{c.COLOR_NORMAL}")
+def get_topic(questions,catalog,current_user):
+    screen.clear()
+    screen.print(f"{c.COLOR_HEADER}These are our topics:{c.COLOR_NORMAL}")
     topics = {}
     id = 0
-    for file_name in os.listdir(c.DATA_FOLDER):
-        if file_name.endswith(".csv") and file_name != f"{c.USER_CSVFILE_NAME}.csv":
-            id += 1
-            topics[id] = file_name.replace(".csv","")
-            print(f"{id} - {topics[id]}")
+    screen.print(" ID  Topic                          Questions  Enabled    Score  Last updated")
+    for topic_name in catalog.refresh():
+        id += 1
+        topics[id] = topic_name
+        topic = catalog.topics[topic_name]
+        screen.print(f"{id:3d}  {topic_name.ljust(30)} {topic['questions']:9d} {topic['enabled']:8d} " + score_to_str(topic['answered'],topic['asked']).rjust(8) + f"  {topic['time_stamp']} by {topic['user']}")
 
     while True:
-        topic_id = input(f"{c.COLOR_INPUT}Enter topic ID (or q to cancel):{c.COLOR_NORMAL} ").lower()
+        topic_id = screen.input(f"{c.COLOR_INPUT}Enter topic ID (or q to cancel):{c.COLOR_NORMAL} ").lower()
         if topic_id == "q":
             break
         try:
             topic_id = int(topic_id)
         except:
-            print(f"{c.COLOR_WARNING}Please choose a valid topic ID.{c.COLOR_NORMAL}")
+            screen.print(f"{c.COLOR_WARNING}Please choose a valid topic ID.{c.COLOR_NORMAL}")
         else:
             if 1 <= topic_id <= id:
-                questions.data_file_name = f"{topics[topic_id]}"
-                questions.read_file()
+                questions.switch_topic(topics[topic_id],current_user)
+                set_last_topic(topics[topic_id])
                 break
-            print(f"{c.COLOR_WARNING}Please choose a valid topic ID.{c.COLOR_NORMAL}")
+            screen.print(f"{c.COLOR_WARNING}Please choose a valid topic ID.{c.COLOR_NORMAL}")
     return c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
 
 def say_goodbye():
-    os.system('cls' if os.name == 'nt' else 'clear')
-    print(f"{c.COLOR_HEADER}Thank you and goodbye!{c.COLOR_NORMAL}")
+    screen.clear()
+    screen.print(f"{c.COLOR_HEADER}Thank you and goodbye!{c.COLOR_NORMAL}")
     return c.BREAK_OUT_OF_JAIL
 
-def display_main_menu(current_user_role,number_of_questions):
-    os.system('cls' if os.name == 'nt' else 'clear')
-    print(f"{c.COLOR_HEADER}Main menu{c.COLOR_NORMAL}")
-    print("┌────────────────────────────────┐")
-    print("│ C - Choose a topic             │")
-    print("│ P - Practise                   │")
-    print("│ T - Test your knowledge        │")
-    print("│ S - Statistics                 │")
-    print("│ M - Manage questions           │")
-    print("│ U - User profiles              │")
-    print("│ Q - Quit program               │")
-    print("└────────────────────────────────┘")
+def display_main_menu(current_user_role,questions):
+# questions may still be loading (QuestionBankLoader), so they are only asked for the number of enabled questions
+# when a feature needs them
+    screen.clear()
+    screen.print(f"{c.COLOR_HEADER}Main menu{c.COLOR_NORMAL}")
+    screen.print("┌────────────────────────────────┐")
+    screen.print("│ C - Choose a topic             │")
+    screen.print("│ P - Practise                   │")
+    screen.print("│ T - Test your knowledge        │")
+    screen.print("│ X - Mixed test (all topics)    │")
+    screen.print("│ S - Statistics                 │")
+    screen.print("│ G - Statistics of all topics   │")
+    screen.print("│ R - My results                 │")
+    screen.print("│ M - Manage questions           │")
+    screen.print("│ U - User profiles              │")
+    screen.print("│ Q - Quit program               │")
+    screen.print("└────────────────────────────────┘")
 
     while True:
-        str = input(f"{c.COLOR_INPUT}Input action key:{c.COLOR_NORMAL} ").upper()
-        if str in "PTS" and number_of_questions < c.MINIMUM_NUMBER_OF_ENABLED_ITEMS:
-            input(f"{c.COLOR_WARNING}You cannot use this feature as there are too few questions available.{c.COLOR_NORMAL}")
+        str = screen.input(f"{c.COLOR_INPUT}Input action key:{c.COLOR_NORMAL} ").upper()
+        if str in "PTS" and questions.enabled_rows < c.MINIMUM_NUMBER_OF_ENABLED_ITEMS:
+            screen.input(f"{c.COLOR_WARNING}You cannot use this feature as there are too few questions available.{c.COLOR_NORMAL}")
             return c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
         if str in "MU" and current_user_role != c.USER_TYPE_ADMIN:
-            input(f"{c.COLOR_WARNING}You have no permission to use this feature. Press enter to continue.{c.COLOR_NORMAL}")
+            screen.input(f"{c.COLOR_WARNING}You have no permission to use this feature. Press enter to continue.{c.COLOR_NORMAL}")
             return c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
         match str:
             case "C":
@@ -76,30 +88,36 @@ def display_main_menu(current_user_role,number_of_questions):
                 return c.WINDOW_PRACTISE + c.EVENT_VIEW_ITEMS
             case "T":
                 return c.WINDOW_TEST + c.EVENT_VIEW_ITEMS
+            case "X":
+                return c.WINDOW_MIXED_TEST + c.EVENT_VIEW_ITEMS
             case "S":
                 return c.WINDOW_STATS + c.EVENT_VIEW_ITEMS
+            case "G":
+                return c.WINDOW_GLOBAL_STATS + c.EVENT_VIEW_ITEMS
+            case "R":
+                return c.WINDOW_RESULTS + c.EVENT_VIEW_ITEMS
             case "M":
                 return c.WINDOW_QMANAGER + c.EVENT_VIEW_ITEMS
             case "U":
                 return c.WINDOW_USERS + c.EVENT_VIEW_ITEMS
             case "Q":
-                if input(f"{c.COLOR_INPUT}Do you really want to quit the program? y/n:{c.COLOR_NORMAL} ").lower() == "y":
+                if screen.input(f"{c.COLOR_INPUT}Do you really want to quit the program? y/n:{c.COLOR_NORMAL} ").lower() == "y":
                     return c.WINDOW_QUIT_PROGRAM + c.EVENT_VIEW_ITEMS
                 else:
                     return c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
-        print(f"{c.COLOR_WARNING}Please enter a valid action key.{c.COLOR_NORMAL}")
+        screen.print(f"{c.COLOR_WARNING}Please enter a valid action key.{c.COLOR_NORMAL}")
 
 def display_data_window(DataHandler,window_event,current_user):
-    os.system('cls' if os.name == 'nt' else 'clear')
+    screen.clear()
     DataHandler.paint_data_window(window_event // c.WINDOW_EXTRACTOR * c.WINDOW_EXTRACTOR)
     match extract_event_id(window_event):
         case c.EVENT_VIEW_ITEMS:
             if window_event // c.WINDOW_EXTRACTOR * c.WINDOW_EXTRACTOR == c.WINDOW_USERS:
-                print_footer(DataHandler.window_size,"A - Add | E - Edit | D - Delete | S - Save changes | Q - Quit",True)
-                return DataHandler.ask_action(c.WINDOW_USERS,"AEDSQNPLF")
+                print_footer(DataHandler.window_size,"A - Add | E - Edit | D - Delete | V - View | S - Save | Q - Quit",True)
+                return DataHandler.ask_action(c.WINDOW_USERS,"AEDSQNPLFV")
             elif window_event // c.WINDOW_EXTRACTOR * c.WINDOW_EXTRACTOR == c.WINDOW_QMANAGER:
-                print_footer(DataHandler.window_size,"A - Add | E - Edit | X - Enable/disable | S - Save changes | Q - Quit",True)
-                return DataHandler.ask_action(c.WINDOW_QMANAGER,"AEXSQNPLF")
+                print_footer(DataHandler.window_size,"A - Add | E - Edit | X - Enable/disable | V - View | / - Search | S - Save changes | Q - Quit",True)
+                return DataHandler.ask_action(c.WINDOW_QMANAGER,"AEXSQNPLFV/")
             elif window_event // c.WINDOW_EXTRACTOR * c.WINDOW_EXTRACTOR == c.WINDOW_STATS:
                 print_footer(DataHandler.window_size,"Q - Quit",True)
                 return DataHandler.ask_action(c.WINDOW_STATS,"QNPLF")
@@ -120,112 +138,182 @@ def display_data_window(DataHandler,window_event,current_user):
         case c.EVENT_SAVE_ITEMS:
             print_footer(DataHandler.window_size,"Saving changes",False)
             if DataHandler.save_file(current_user) == True:
+# back in the main menu the window shows all records again, e.g. for the statistics
+                DataHandler.set_view(None)
                 return c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
             else:
                 return window_event // c.WINDOW_EXTRACTOR * c.WINDOW_EXTRACTOR + c.EVENT_VIEW_ITEMS
  
-def display_practise_window(questions,current_user):
-    cnt = 0
-    score = 0
+def display_practise_window(engine,current_user):
+    questions = engine.questions
+    session = engine.start_session(current_user,c.QUIZ_MODE_PRACTISE)
     while True:
-        print_header(questions.window_size,f"Practise test: {questions.data_file_name}",score,cnt)
-
-        record_id = questions.get_random_weighted_record_id()
-        print(f"Question: {questions.data[record_id]['Question']}.")
-        if questions.data[record_id]["Type"] == "m":
-            print(f"(A) {questions.data[record_id]['Answer_A']}")
-            print(f"(B) {questions.data[record_id]['Answer_B']}")
-            print(f"(C) {questions.data[record_id]['Answer_C']}")
-            print(f"(D) {questions.data[record_id]['Answer_D']}")
-        print("─" * questions.window_size)
-
-        if questions.data[record_id]['Flag'] == "m":
+        print_header(questions.window_size,f"Practise test: {session.topic}",session.score,session.cnt)
+        question = engine.next_question(session)
+        if question == None:
+            break
+        print_question(questions.window_size,"Question",question)
+
+        if question["type"] == "m":
             while True:
-                answer = input(f"{c.COLOR_INPUT}Choose A, B, C or D, (or q to quit):{c.COLOR_NORMAL} ").lower()
+                answer = screen.input(f"{c.COLOR_INPUT}Choose A, B, C or D, (or q to quit):{c.COLOR_NORMAL} ").lower()
                 if answer in ["q","a","b","c","d"]:
                     break
         else:
-            answer = input(f"{c.COLOR_INPUT}Your answer (or q to quit):{c.COLOR_NORMAL} ").lower()
+            answer = screen.input(f"{c.COLOR_INPUT}Your answer (or q to quit):{c.COLOR_NORMAL} ").lower()
 
         if answer == "q":
             break
-        
-        cnt += 1
-        questions.data[record_id]["Asked"] = int(questions.data[record_id]["Asked"]) + 1
-        if answer == questions.data[record_id]["Correct"].lower():
-            score += 1
-            questions.data[record_id]["Answered"] = int(questions.data[record_id]["Answered"]) + 1
-            questions.data[record_id]["Score"] = float(questions.data[record_id]["Answered"]/questions.data[record_id]["Asked"])
-            if input(f"Correct answer. Congrats!\n{c.COLOR_INPUT}Press Enter to continue or q to quit.{c.COLOR_NORMAL}").lower() == "q":
+
+        correct, correct_answer = engine.submit_answer(session,answer)
+        if correct:
+            if screen.input(f"Correct answer. Congrats!\n{c.COLOR_INPUT}Press Enter to continue or q to quit.{c.COLOR_NORMAL}").lower() == "q":
                 break
             continue
-        if input(f"Wrong!!! Yikes!\n{c.COLOR_INPUT}Press Enter to continue or q to quit.{c.COLOR_NORMAL}").lower() == "q":
+        if screen.input(f"Wrong!!! Yikes!\n{c.COLOR_INPUT}Press Enter to continue or q to quit.{c.COLOR_NORMAL}").lower() == "q":
             break
 
-    print_header(questions.window_size,f"Practise test: {questions.data_file_name}")
-    input(f"Your final score is: {score} of {cnt} = {score_to_str(score,cnt)} answered correctly.")
-    questions.save_flag = True
-    questions.save_file(current_user,True)
+    score, cnt = engine.finish_session(session)
+    print_header(questions.window_size,f"Practise test: {session.topic}")
+    screen.input(f"Your final score is: {score} of {cnt} = {score_to_str(score,cnt)} answered correctly.")
     return c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
 
-def display_test_window(questions,current_user):
+def display_test_window(engine,current_user):
+    questions = engine.questions
     print_header(questions.window_size,f"Test: {questions.data_file_name}")
 
     while True:
-        print(f"{c.COLOR_INPUT}How many test questions do you want to include?")
-        str = input(f"Please choose between 1 and {questions.data_rows} or q + enter to quit:{c.COLOR_NORMAL} ").lower()
+        screen.print(f"{c.COLOR_INPUT}How many test questions do you want to include?")
+        str = screen.input(f"Please choose between 1 and {questions.enabled_rows} or q + enter to quit:{c.COLOR_NORMAL} ").lower()
         if str == "q":
             return c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
         try:
-            cnt = int(str)
+            session = engine.start_session(current_user,c.QUIZ_MODE_TEST,int(str))
+            break
         except ValueError:
-            print(f"{c.COLOR_WARNING}Please choose between 1 and {questions.data_rows} or q + enter to quit:{c.COLOR_NORMAL} ")
-        else:
-            if 1 <= cnt <= questions.data_rows:
-                break
-            print(f"{c.COLOR_WARNING}Please choose between 1 and {questions.data_rows} or q + enter to quit:{c.COLOR_NORMAL} ")
-
-    random_keys = questions.get_random_key_sample(cnt)
-
-    score = 0
-    for question_counter in range(1,cnt + 1):
-        print_header(questions.window_size,f"Test: {questions.data_file_name} (question nr. {question_counter})",score,cnt)
-        record_id = random_keys.pop()
-        print(f"Question {question_counter}: {questions.data[record_id]['Question']}.")
-        if questions.data[record_id]["Type"] == "m":
-            print(f"(A) {questions.data[record_id]['Answer_A']}")
-            print(f"(B) {questions.data[record_id]['Answer_B']}")
-            print(f"(C) {questions.data[record_id]['Answer_C']}")
-            print(f"(D) {questions.data[record_id]['Answer_D']}")
-        print("─" * questions.window_size)
-        answer = input(f"{c.COLOR_INPUT}Your answer:{c.COLOR_NORMAL} ").lower()
-        questions.data[record_id]["Asked"] = int(questions.data[record_id]["Asked"]) + 1
-        if answer == questions.data[record_id]["Correct"].lower():
-            score += 1
-            print("Correct.")
-        else:
-            print("Wrong.")
-        input("Press Enter to continue.")
+            screen.print(f"{c.COLOR_WARNING}Please choose between 1 and {questions.enabled_rows} or q + enter to quit:{c.COLOR_NORMAL} ")
+    return ask_test_questions(engine,session,questions.window_size)
+
+def display_mixed_test_window(engine,catalog,current_user):
+# the number of enabled questions per topic comes from the topic catalog, the questions are sampled from the files
+    window_size = engine.questions.window_size
+    print_header(window_size,"Mixed test: all topics")
+    topic_names = catalog.refresh()
+    enabled_counts = {topic_name: catalog.topics[topic_name]["enabled"] for topic_name in topic_names}
+    enabled_rows = sum(enabled_counts.values())
+    if enabled_rows < c.MINIMUM_NUMBER_OF_ENABLED_ITEMS:
+        screen.input(f"{c.COLOR_WARNING}You cannot use this feature as there are too few questions available.{c.COLOR_NORMAL}")
+        return c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
+
+    while True:
+        screen.print(f"{c.COLOR_INPUT}How many test questions do you want to include?")
+        str = screen.input(f"Please choose between 1 and {enabled_rows} or q + enter to quit:{c.COLOR_NORMAL} ").lower()
+        if str == "q":
+            return c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
+        try:
+            question_count = int(str)
+        except ValueError:
+            question_count = 0
+        if 1 <= question_count <= enabled_rows:
+            break
+        screen.print(f"{c.COLOR_WARNING}Please choose between 1 and {enabled_rows} or q + enter to quit:{c.COLOR_NORMAL} ")
+    while True:
+        answer = screen.input(f"{c.COLOR_INPUT}A - any questions of all topics | E - the same number of questions from every topic | Q - Quit:{c.COLOR_NORMAL} ").upper()
+        if answer == "Q":
+            return c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
+        if answer in ["A","E"]:
+            break
+    try:
+        session = engine.start_mixed_session(current_user,question_count,topic_names,enabled_counts if answer == "E" else None)
+    except ValueError:
+        screen.input(f"{c.COLOR_WARNING}You cannot use this feature as there are too few questions available.{c.COLOR_NORMAL}")
+        return c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
+    return ask_test_questions(engine,session,window_size)
+
+def ask_test_questions(engine,session,window_size):
+# the question and answer loop of a test
+    while True:
+        print_header(window_size,f"Test: {session.topic} (question nr. {session.cnt + 1})",session.score,session.question_count)
+        question = engine.next_question(session)
+        if question == None:
+            break
+        print_question(window_size,f"Question {question['number']}" + (f" ({question['topic']})" if session.mode == c.QUIZ_MODE_MIXED else ""),question)
+        answer = screen.input(f"{c.COLOR_INPUT}Your answer:{c.COLOR_NORMAL} ").lower()
+        correct, correct_answer = engine.submit_answer(session,answer)
+        screen.print("Correct." if correct else "Wrong.")
+        screen.input("Press Enter to continue.")
 
-    with open(c.RESULTS_FILENAME, "a") as result_file:
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        result_file.write(f"{timestamp} {questions.data_file_name.ljust(30)} {current_user.ljust(10)}" + f" {score}".rjust(6) + f" {cnt}".rjust(6) + f" {score*100/cnt:.1f} %".rjust(7) + "\n")
+    score, cnt = engine.finish_session(session)
+    print_header(window_size,f"Practise test: {session.topic}")
+    screen.input(f"Your final score is: {score} of {cnt} = {score_to_str(score,cnt)} answered correctly.")
+    return c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
+
+def display_results_window(results,current_user,topic):
+    only_topic = False
+    while True:
+        history = results.fetch_results(current_user,topic if only_topic else None)
+        print_header(c.RESULTS_WINDOW_SIZE,f"Last test results of {current_user}" + (f" for {topic}" if only_topic else ""))
+        screen.print("Date       Time     Topic                          Correct Total   Score")
+        for time_stamp, result_topic, user_name, correct, total in history:
+            screen.print(f"{time_stamp} {result_topic.ljust(30)}" + f" {correct}".rjust(8) + f" {total}".rjust(6) + score_to_str(correct,total).rjust(8))
+        if len(history) == 0:
+            screen.print("No results yet. Take a test!")
+        screen.print("─" * c.RESULTS_WINDOW_SIZE)
+        answer = screen.input(f"{c.COLOR_INPUT}T - only {topic} | A - all topics | Q - Quit:{c.COLOR_NORMAL} ").upper()
+        if answer == "Q":
+            return c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
+        only_topic = answer == "T" or (only_topic and answer != "A")
 
-    print_header(questions.window_size,f"Practise test: {questions.data_file_name}")
-    input(f"Your final score is: {score} of {cnt} = {score_to_str(score,cnt)} answered correctly.")
+def display_global_stats_window(catalog,results):
+# the topic summaries are only scanned again for the files which changed since the last time
+    window_size = c.GLOBAL_STATS_WINDOW_SIZE
+    topic_names = catalog.refresh()
+    print_header(window_size,"Statistics of all topics")
+    screen.print("Topic                          Questions  Enabled      Asked   Answered    Score")
+    totals = {"questions": 0, "enabled": 0, "asked": 0, "answered": 0}
+    hardest = []
+    for topic_name in topic_names:
+        topic = catalog.topics[topic_name]
+        screen.print(f"{topic_name[:30].ljust(30)} {topic['questions']:9d} {topic['enabled']:8d} {topic['asked']:10d} {topic['answered']:10d}" + score_to_str(topic['answered'],topic['asked']).rjust(9))
+        for key in totals:
+            totals[key] += topic[key]
+        hardest.extend((answered / asked, -asked, topic_name, record_id, text, answered) for record_id, text, asked, answered in topic["hardest"])
+    screen.print("─" * window_size)
+    screen.print(f"{'All topics'.ljust(30)} {totals['questions']:9d} {totals['enabled']:8d} {totals['asked']:10d} {totals['answered']:10d}" + score_to_str(totals['answered'],totals['asked']).rjust(9))
+
+    print_header(window_size,"Hardest questions",clear=False)
+    screen.print(f"{'Topic'.ljust(20)} {'ID':>5}  {'Question'.ljust(window_size - 46)}" + "Score".rjust(8) + " / asked")
+    for rate, asked, topic_name, record_id, text, answered in sorted(hardest)[:c.HARDEST_QUESTIONS_COUNT]:
+        screen.print(f"{topic_name[:20].ljust(20)} {record_id:5d}  {text[:window_size - 46].ljust(window_size - 46)}" + score_to_str(answered,-asked).rjust(8) + f" / {-asked}")
+    if len(hardest) == 0:
+        screen.print(f"No question was asked {c.HARDEST_MIN_ASKED} times yet.")
+
+    print_header(window_size,"Test results of all users",clear=False)
+    screen.print("User                            Tests  Correct    Total  Average score")
+    for user_name, tests, correct, total, average in results.fetch_user_averages():
+        screen.print(f"{user_name[:30].ljust(30)} {tests:6d} {correct:8d} {total:8d}" + f"{average:.1f} %".rjust(15))
+    screen.print("─" * window_size)
+    screen.input(f"{c.COLOR_INPUT}Press Enter to continue.{c.COLOR_NORMAL}")
     return c.WINDOW_MAIN_MENU + c.EVENT_VIEW_ITEMS
 
 # helper functions for the display_ functions
 def print_footer(window_size, description,set_page_bar):
-    print("├" + "─" * (window_size - 2) + "┤")
-    print(f"│ {description.ljust(window_size-4)} │")
+    screen.print("├" + "─" * (window_size - 2) + "┤")
+    screen.print(f"│ {description.ljust(window_size-4)} │")
     if set_page_bar == True:
-        print("│ N - next page | P - previous page | F - First page | L - Last page".ljust(window_size-2) + " │")
-    print("└" + "─" * (window_size - 2) + "┘")
+        screen.print("│ N - next page | P - previous page | F - First page | L - Last page".ljust(window_size-2) + " │")
+    screen.print("└" + "─" * (window_size - 2) + "┘")
+
+def print_question(window_size,head_line,question):
+    screen.print(f"{head_line}: {question['text']}.")
+    for letter, choice in question["choices"].items():
+        screen.print(f"({letter}) {choice}")
+    screen.print("─" * window_size)
 
-def print_header(window_size,head_line, score = -1, cnt = 0):
-    os.system('cls' if os.name == 'nt' else 'clear')
-    print(f"{c.COLOR_HEADER}{head_line}{c.COLOR_NORMAL}")
+def print_header(window_size,head_line, score = -1, cnt = 0, clear = True):
+    if clear:
+        screen.clear()
+    screen.print(f"{c.COLOR_HEADER}{head_line}{c.COLOR_NORMAL}")
     if score != -1:
-        print(f"Current score: {score} of {cnt} = {score_to_str(score,cnt)}")
-    print("─" * window_size)
+        screen.print(f"Current score: {score} of {cnt} = {score_to_str(score,cnt)}")
+    screen.print("─" * window_size)